@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import os
-from typing import Any, Dict, Optional, Set
+import sys
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Optional, Tuple
 
 import httpx
 from fastapi import Depends, HTTPException, Request
@@ -10,15 +16,27 @@ from .config import load_env
 
 load_env()
 
+# Validated sessions are cached briefly so an admin browser replaying the same token
+# doesn't hit Supabase on every request. A revoked token stays valid for at most this long.
+# Set ADMIN_TOKEN_CACHE_TTL=0 to disable.
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("ADMIN_TOKEN_CACHE_TTL", "60") or "60")
+TOKEN_CACHE_MAX_SIZE = 1024
 
-def _parse_admin_emails() -> Optional[Set[str]]:
+
+def _parse_admin_emails() -> Optional[FrozenSet[str]]:
     raw = (os.getenv("ADMIN_EMAILS") or "").strip()
     if not raw:
         return None
-    emails = {e.strip().lower() for e in raw.split(",") if e.strip()}
+    emails = frozenset(sys.intern(e.strip().lower()) for e in raw.split(",") if e.strip())
     return emails or None
 
 
+# Env vars don't change at runtime, so parse them once instead of on every request.
+# None means the allowlist is disabled and require_admin skips it entirely.
+ADMIN_EMAILS = _parse_admin_emails()
+
+
+@lru_cache(maxsize=1)
 def _supabase_url() -> str:
     url = (os.getenv("SUPABASE_URL") or "").strip()
     if not url:
@@ -26,6 +44,7 @@ def _supabase_url() -> str:
     return url.rstrip("/")
 
 
+@lru_cache(maxsize=1)
 def _supabase_auth_key() -> str:
     """
     Key used to call Supabase Auth endpoints.
@@ -43,14 +62,38 @@ def _supabase_auth_key() -> str:
     return key
 
 
+AUTH_USER_PATH = "/auth/v1/user"
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """
+    Long-lived client so session checks reuse a warm HTTPS connection to Supabase
+    instead of paying a TCP+TLS handshake per admin request.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=_supabase_url(),
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            headers={"apikey": _supabase_auth_key()},
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 async def _fetch_user(access_token: str) -> Dict[str, Any]:
-    url = f"{_supabase_url()}/auth/v1/user"
-    headers = {
-        "apikey": _supabase_auth_key(),
-        "Authorization": f"Bearer {access_token}",
-    }
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        resp = await client.get(url, headers=headers)
+    client = _get_client()
+    # Base URL and `apikey` live on the shared client; only the caller's token varies per request.
+    resp = await client.get(AUTH_USER_PATH, headers={"Authorization": f"Bearer {access_token}"})
     if resp.status_code != 200:
         raise HTTPException(status_code=401, detail="Invalid or expired session")
     data = resp.json()
@@ -59,29 +102,118 @@ async def _fetch_user(access_token: str) -> Dict[str, Any]:
     return data
 
 
-async def require_admin(request: Request) -> Dict[str, Any]:
+_token_cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+# In-flight `/auth/v1/user` lookups by token key; every concurrent miss awaits the same task.
+_token_inflight: "Dict[bytes, asyncio.Task[Dict[str, Any]]]" = {}
+
+
+def _token_cache_key(access_token: str) -> bytes:
+    # Don't keep raw bearer tokens around in memory longer than needed.
+    return hashlib.blake2b(access_token.encode("utf-8"), digest_size=16).digest()
+
+
+def _token_cache_get(key: bytes) -> Optional[Dict[str, Any]]:
+    entry = _token_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, user = entry
+    if expires_at <= time.monotonic():
+        _token_cache.pop(key, None)
+        return None
+    _token_cache.move_to_end(key)
+    return user
+
+
+def _token_cache_put(key: bytes, user: Dict[str, Any]) -> None:
+    _token_cache[key] = (time.monotonic() + TOKEN_CACHE_TTL_SECONDS, user)
+    _token_cache.move_to_end(key)
+    while len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+        _token_cache.popitem(last=False)
+
+
+async def _fetch_user_cached(access_token: str) -> Dict[str, Any]:
     """
-    Validates Supabase access token and (optionally) enforces ADMIN_EMAILS allowlist.
+    `_fetch_user` behind a small TTL+LRU cache. Only successful lookups are cached.
+
+    Concurrent misses for the same token share one Supabase call (single-flight), so a
+    burst of requests right after expiry doesn't fan out into a burst of auth calls.
     """
+    if TOKEN_CACHE_TTL_SECONDS <= 0:
+        return await _fetch_user(access_token)
+
+    key = _token_cache_key(access_token)
+    user = _token_cache_get(key)
+    if user is not None:
+        return user
+
+    task = _token_inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_and_cache_user(key, access_token))
+        _token_inflight[key] = task
+        task.add_done_callback(lambda t: _finish_inflight(key, t))
+    # shield: a cancelled request (client gone) must not cancel the lookup other waiters share.
+    return await asyncio.shield(task)
+
+
+async def _fetch_and_cache_user(key: bytes, access_token: str) -> Dict[str, Any]:
+    user = await _fetch_user(access_token)
+    _token_cache_put(key, user)
+    return user
+
+
+def _finish_inflight(key: bytes, task: "asyncio.Task[Dict[str, Any]]") -> None:
+    # Only drop our own entry; by now a later miss may have started a fresh lookup.
+    if _token_inflight.get(key) is task:
+        del _token_inflight[key]
+    if not task.cancelled():
+        task.exception()  # mark a failure as retrieved even if every waiter went away
+
+
+async def _authorize(request: Request) -> Dict[str, Any]:
     auth = request.headers.get("authorization") or ""
-    if not auth.lower().startswith("bearer "):
+    # Only the 7-char scheme prefix needs case-folding; slice the token out directly.
+    if auth[:7].lower() != "bearer ":
         raise HTTPException(status_code=401, detail="Missing bearer token")
 
-    token = auth.split(" ", 1)[1].strip()
+    token = auth[7:].strip()
     if not token:
         raise HTTPException(status_code=401, detail="Missing bearer token")
 
-    user = await _fetch_user(token)
-    allow = _parse_admin_emails()
-    if allow is None:
+    user = await _fetch_user_cached(token)
+    if ADMIN_EMAILS is None:
         return user
 
     email = (user.get("email") or "").strip().lower()
-    if not email or email not in allow:
+    if not email or email not in ADMIN_EMAILS:
         raise HTTPException(status_code=403, detail="Not authorized")
     return user
 
 
+async def require_admin(request: Request) -> Dict[str, Any]:
+    """
+    Validates Supabase access token and (optionally) enforces ADMIN_EMAILS allowlist.
+
+    The outcome (user or HTTPException) is remembered on `request.state`, so if several
+    dependencies in one request declare this check, it is only resolved once. FastAPI's own
+    dependency cache is keyed by callable identity and doesn't cover wrapped/re-declared uses.
+    """
+    state = request.state
+    cached_error = getattr(state, "_admin_error", None)
+    if cached_error is not None:
+        raise cached_error
+    cached_user = getattr(state, "_admin_user", None)
+    if cached_user is not None:
+        return cached_user
+
+    try:
+        user = await _authorize(request)
+    except HTTPException as e:
+        state._admin_error = e
+        raise
+    state._admin_user = user
+    return user
+
+
 AdminUser = Dict[str, Any]
 RequireAdmin = Depends(require_admin)
 
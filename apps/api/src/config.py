@@ -4,6 +4,9 @@ from pathlib import Path
 
 from dotenv import load_dotenv
 
+_API_DIR = Path(__file__).resolve().parents[1]
+_LOADED = False
+
 
 def load_env() -> None:
     """
@@ -11,7 +14,11 @@ def load_env() -> None:
 
     Note: Uvicorn is often started from the repo root, so relying on `load_dotenv()`
     without an explicit path can silently miss the intended env file.
-    """
-    api_dir = Path(__file__).resolve().parents[1]
-    load_dotenv(dotenv_path=api_dir / ".env", override=False)
 
+    Every module calls this at import time; only the first call reads the file.
+    """
+    global _LOADED
+    if _LOADED:
+        return
+    _LOADED = True
+    load_dotenv(dotenv_path=_API_DIR / ".env", override=False)
@@ -1,29 +1,69 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import logging
 import os
-from typing import Generator
+from typing import AsyncGenerator
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is required")
 
-# Create engine with connection pooling
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=StaticPool,
-    pool_pre_ping=True,
+
+def _async_database_url(url: str) -> str:
+    # Keep DATABASE_URL in the plain libpq form used by other tools; pick the asyncpg driver here.
+    for prefix in ("postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+def _uses_pgbouncer(url: str) -> bool:
+    """
+    PgBouncer in transaction mode: the pre-ping `SELECT 1` leaves server backends
+    "idle in transaction", so we rotate connections via pool_recycle instead.
+    """
+    if os.getenv("DB_PGBOUNCER", "").strip().lower() in {"1", "true", "yes", "y", "on"}:
+        return True
+    try:
+        host = make_url(url).host or ""
+    except Exception:
+        return False
+    return "pgbouncer" in host.lower()
+
+
+USES_PGBOUNCER = _uses_pgbouncer(DATABASE_URL)
+if USES_PGBOUNCER:
+    pool_pre_ping = False
+    pool_recycle = 60
+    # asyncpg's prepared-statement cache doesn't survive transaction pooling.
+    connect_args = {"statement_cache_size": 0}
+else:
+    pool_pre_ping = True
+    pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "1800") or "1800")
+    connect_args = {}
+logger.debug("Database pool: pgbouncer=%s pre_ping=%s recycle=%ss", USES_PGBOUNCER, pool_pre_ping, pool_recycle)
+
+# Create engine with connection pooling (QueuePool). LIFO checkout keeps a small set of
+# warm connections in use and lets idle ones age out via pool_recycle.
+engine = create_async_engine(
+    _async_database_url(DATABASE_URL),
+    pool_size=int(os.getenv("DB_POOL_SIZE", "10") or "10"),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20") or "20"),
+    pool_timeout=30,
+    pool_recycle=pool_recycle,
+    pool_pre_ping=pool_pre_ping,
+    pool_use_lifo=True,
+    connect_args=connect_args,
     echo=False  # Set to True for SQL debugging
 )
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
-def get_db() -> Generator[Session, None, None]:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
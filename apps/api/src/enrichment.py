@@ -4,7 +4,11 @@ Runs when an OpenAI API key is configured.
 """
 
 import os
+from functools import lru_cache
+from string import Template
 from typing import Dict, Any, Optional, Tuple
+from .it_relevance import is_it_relevant, scan_it_relevance
+from .pdf_text import extract_text_from_pdf_url
 from .supabase_rest import upsert_proposal_label
 from .llm import chat_json_schema, llm_enabled, allow_network_pdf_fetch, get_llm_config
 
@@ -34,6 +38,21 @@ Svar i følgende JSON format:
 }}
 """
 
+# Compiled once: `str.format` re-parses the whole prompt on every call, which adds up in backfills.
+_ENRICHMENT_PROMPT_TEMPLATE = Template(
+    ENRICHMENT_PROMPT
+    .replace("{title}", "$title")
+    .replace("{resume}", "$resume")
+    .replace("{pdf_excerpt}", "$pdf_excerpt")
+    .replace("{{", "{")
+    .replace("}}", "}")
+)
+
+ENRICHMENT_SYSTEM_MESSAGE: Dict[str, str] = {
+    "role": "system",
+    "content": "Du er en ekspert i dansk IT-politik. Svar kun med valid JSON.",
+}
+
 ENRICHMENT_SCHEMA: Dict[str, Any] = {
     "type": "object",
     "additionalProperties": False,
@@ -46,8 +65,23 @@ ENRICHMENT_SCHEMA: Dict[str, Any] = {
     "required": ["it_relevant", "it_topics", "it_summary_da", "why_it_relevant_da"],
 }
 
+# The same title+resume text is scanned repeatedly (should_enrich_proposal, then the
+# keyword fallback in enrich_proposal), so memoize the keyword heuristics by text.
+@lru_cache(maxsize=8192)
+def _is_it_relevant_cached(text: str) -> bool:
+    return is_it_relevant(text)
+
+
+@lru_cache(maxsize=8192)
+def _scan_it_relevance_cached(text: str) -> Tuple[bool, Tuple[str, ...]]:
+    # Tuple so callers can't mutate the cached value.
+    it_relevant, it_topics = scan_it_relevance(text)
+    return it_relevant, tuple(it_topics)
+
+
 def _extract_pdf_urls(proposal_data: Dict[str, Any]) -> Tuple[Optional[str], list[str]]:
-    # Prefer PDFs directly attached to the Sag dict during ingestion.
+    # Prefer PDFs directly attached to the Sag dict during ingestion (or projected out of
+    # `raw_json` by backfill queries, e.g. `mainPdfUrl:raw_json->mainPdfUrl`).
     main = proposal_data.get("mainPdfUrl")
     main_pdf_url = main if isinstance(main, str) and main.strip() else None
     pdf_urls_value = proposal_data.get("pdfUrls")
@@ -81,11 +115,9 @@ def _build_pdf_excerpt(proposal_data: Dict[str, Any]) -> str:
         return ""
 
     try:
-        from .pdf_text import extract_text_from_pdf_url
-
         max_pages = int(os.getenv("ENRICH_PDF_MAX_PAGES", "25") or "25")
         max_chars = int(os.getenv("ENRICH_PDF_MAX_CHARS", "40000") or "40000")
-        text = extract_text_from_pdf_url(url, max_pages=max_pages)
+        text = extract_text_from_pdf_url(url, max_pages=max_pages, max_chars=max_chars)
         if len(text) > max_chars:
             return text[:max_chars] + "\n\n[... afkortet ...]"
         return text
@@ -106,14 +138,12 @@ def enrich_proposal(proposal_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
     if not llm_enabled():
         # Return basic enrichment based on keyword matching
-        from .it_relevance import is_it_relevant, extract_it_topics
-
         title = proposal_data.get('titel', '')
         resume = proposal_data.get('resume', '')
 
         text_to_analyze = f"{title} {resume}"
-        it_relevant = is_it_relevant(text_to_analyze)
-        it_topics = extract_it_topics(text_to_analyze)
+        it_relevant, cached_topics = _scan_it_relevance_cached(text_to_analyze)
+        it_topics = list(cached_topics)
 
         return {
             "it_relevant": it_relevant,
@@ -129,7 +159,7 @@ def enrich_proposal(proposal_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         resume = proposal_data.get('resume', '')
         pdf_excerpt = _build_pdf_excerpt(proposal_data)
 
-        prompt = ENRICHMENT_PROMPT.format(
+        prompt = _ENRICHMENT_PROMPT_TEMPLATE.substitute(
             title=title,
             resume=resume or "Ingen resume tilgængelig",
             pdf_excerpt=pdf_excerpt or "Ingen PDF-tekst tilgængelig"
@@ -137,7 +167,7 @@ def enrich_proposal(proposal_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
 
         result = chat_json_schema(
             [
-                {"role": "system", "content": "Du er en ekspert i dansk IT-politik. Svar kun med valid JSON."},
+                ENRICHMENT_SYSTEM_MESSAGE,
                 {"role": "user", "content": prompt},
             ],
             schema=ENRICHMENT_SCHEMA,
@@ -167,14 +197,12 @@ def enrich_proposal(proposal_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     except Exception as e:
         print(f"LLM enrichment failed: {e}")
         # Fallback to keyword matching
-        from .it_relevance import is_it_relevant, extract_it_topics
-
         title = proposal_data.get('titel', '')
         resume = proposal_data.get('resume', '')
 
         text_to_analyze = f"{title} {resume}"
-        it_relevant = is_it_relevant(text_to_analyze)
-        it_topics = extract_it_topics(text_to_analyze)
+        it_relevant, cached_topics = _scan_it_relevance_cached(text_to_analyze)
+        it_topics = list(cached_topics)
 
         return {
             "it_relevant": it_relevant,
@@ -194,13 +222,11 @@ def should_enrich_proposal(proposal_data: Dict[str, Any]) -> bool:
     Returns:
         bool: True if proposal should be queued for enrichment
     """
-    from .it_relevance import is_it_relevant
-
     title = proposal_data.get('titel', '')
     resume = proposal_data.get('resume', '')
 
     text_to_analyze = f"{title} {resume}"
-    return is_it_relevant(text_to_analyze)
+    return _is_it_relevant_cached(text_to_analyze)
 
 def create_or_update_label(proposal_id: int, enrichment_result: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -6,16 +6,20 @@ Backfill script: resolve + persist PDF URLs for proposals already in Supabase.
 Logs one line per updated proposal.
 
 Run from `apps/api`:
-  python3 -m src.examples.backfill_all_pdfs --limit 100 --offset 0
-  python3 -m src.examples.backfill_all_pdfs --limit 100 --offset 0 --max-rows 500 --dry-run
+  python3 -m src.examples.backfill_all_pdfs --limit 100
+  python3 -m src.examples.backfill_all_pdfs --limit 100 --start-after-id 0 --max-rows 500 --dry-run
   python3 -m src.examples.backfill_all_pdfs --force
+
+Pages by id (keyset) by default; `--use-offset-pagination` is only kept for comparison,
+since offset paging makes Postgres scan and discard every skipped row on each page.
 """
 
 import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
 
-from src.ingestion import IngestionService
-from src.oda import fetch_pdf_urls_for_sag
-from src.supabase_rest import fetch_proposals_page, update_proposal
+# Bulk writes go through an upsert, which needs every NOT NULL column, not just raw_json.
+FULL_ROW_SELECT = "id,periodeid,nummerprefix,nummernumerisk,nummer,titel,resume,opdateringsdato,raw_json"
 
 
 def main() -> None:
@@ -40,82 +44,139 @@ def main() -> None:
         action="store_true",
         help="Update even if pdfUrls already present (re-resolve with current heuristic)",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("ENRICH_CONCURRENCY", "8") or "8"),
+        help="Number of Sager resolved against ODA at once",
+    )
+    parser.add_argument("--batch-size", type=int, default=200, help="Rows per bulk write to Supabase")
     args = parser.parse_args()
 
+    # Imported after argument parsing so `--help` and typos don't pay for loading the app modules.
+    from src.ingestion import IngestionService
+    from src.oda import fetch_pdf_urls_for_sag
+    from src.supabase_rest import fetch_proposals_page, update_proposals_bulk
+
     service = IngestionService()
+    executor = ThreadPoolExecutor(max_workers=max(1, args.concurrency))
+
+    def resolve(proposal_id: int):
+        try:
+            return fetch_pdf_urls_for_sag(
+                service.client,
+                {"id": proposal_id},
+                delay_ms=service.doc_request_delay_ms,
+                max_retries=service.doc_request_retries,
+            )
+        except Exception as e:
+            return e
 
     processed = 0
     updated = 0
     skipped = 0
     failed = 0
-
-    offset = args.offset
-    last_id = args.start_after_id
-    max_rows = args.max_rows if args.max_rows > 0 else None
-
-    while True:
-        if max_rows is not None and processed >= max_rows:
-            break
-
-        if args.use_offset_pagination:
-            page = fetch_proposals_page(select="id,raw_json", limit=args.limit, offset=offset, order="id.asc")
-        else:
-            page = fetch_proposals_page(
-                select="id,raw_json",
-                limit=args.limit,
-                offset=0,
-                order="id.asc",
-                filters={"id": f"gt.{last_id}"},
-            )
-        if not page:
-            break
-
-        for row in page:
+    buffer: list[dict] = []
+
+    def flush() -> None:
+        nonlocal updated, failed
+        if not buffer:
+            return
+        try:
+            if not args.dry_run:
+                update_proposals_bulk(buffer)
+            updated += len(buffer)
+        except Exception as e:
+            failed += len(buffer)
+            print(f"WARNING bulk write of {len(buffer)} rows failed | {e}")
+        buffer.clear()
+
+    try:
+        offset = args.offset
+        last_id = args.start_after_id
+        max_rows = args.max_rows if args.max_rows > 0 else None
+
+        while True:
             if max_rows is not None and processed >= max_rows:
                 break
-            processed += 1
-
-            proposal_id = row.get("id")
-            raw_json = row.get("raw_json") or {}
-            if not proposal_id or not isinstance(raw_json, dict):
-                skipped += 1
-                continue
-
-            existing_urls = raw_json.get("pdfUrls")
-            if not args.force and isinstance(existing_urls, list) and existing_urls:
-                skipped += 1
-                continue
-
-            try:
-                result = fetch_pdf_urls_for_sag(
-                    service.client,
-                    {"id": proposal_id},
-                    delay_ms=service.doc_request_delay_ms,
-                    max_retries=service.doc_request_retries,
+
+            # Without --force most rows are skipped, so only project `raw_json->pdfUrls` for the scan
+            # and load the full (large) raw_json just for the rows we will actually rewrite.
+            select = FULL_ROW_SELECT if args.force else "id,pdfUrls:raw_json->pdfUrls"
+            if args.use_offset_pagination:
+                page = fetch_proposals_page(select=select, limit=args.limit, offset=offset, order="id.asc")
+            else:
+                page = fetch_proposals_page(select=select, limit=args.limit, after_id=last_id)
+            if not page:
+                break
+
+            candidates = []
+            for row in page:
+                if max_rows is not None and processed >= max_rows:
+                    break
+                processed += 1
+
+                proposal_id = row.get("id")
+                if not proposal_id:
+                    skipped += 1
+                    continue
+
+                existing_urls = row.get("pdfUrls")
+                if not args.force and isinstance(existing_urls, list) and existing_urls:
+                    skipped += 1
+                    continue
+
+                candidates.append(row)
+
+            if not args.force and candidates:
+                ids = ",".join(str(r["id"]) for r in candidates)
+                full_rows = fetch_proposals_page(
+                    select=FULL_ROW_SELECT,
+                    limit=len(candidates),
+                    filters={"id": f"in.({ids})"},
                 )
+                full_by_id = {r.get("id"): r for r in full_rows}
+                candidates = [full_by_id.get(r["id"]) or {"id": r["id"]} for r in candidates]
+
+            todo = []
+            for row in candidates:
+                if not isinstance(row.get("raw_json"), dict):
+                    skipped += 1
+                    continue
+                todo.append((row["id"], row))
+
+            # ODA round trips dominate, so resolve the page's Sager concurrently.
+            results = executor.map(resolve, [proposal_id for proposal_id, _ in todo])
+            for (proposal_id, row), result in zip(todo, results):
+                if isinstance(result, Exception):
+                    failed += 1
+                    print(f"WARNING {proposal_id} | {result}")
+                    continue
+
                 main_pdf_url = result.get("mainPdfUrl")
                 pdf_urls = result.get("pdfUrls") or []
 
+                raw_json = row["raw_json"]
                 raw_json["mainPdfUrl"] = main_pdf_url
                 raw_json["pdfUrls"] = pdf_urls
                 raw_json["pdfDocuments"] = result.get("documents") or []
 
-                if not args.dry_run:
-                    update_proposal(proposal_id, {"raw_json": raw_json})
-
-                updated += 1
+                buffer.append(row)
                 print(
                     f"UPDATED {proposal_id} | pdfs={len(pdf_urls)} | mainPdfUrl={main_pdf_url or ''}"
                 )
-            except Exception as e:
-                failed += 1
-                print(f"WARNING {proposal_id} | {e}")
-
-        if args.use_offset_pagination:
-            offset += args.limit
-        else:
-            last_id = max([r.get("id") for r in page if isinstance(r, dict) and isinstance(r.get("id"), int)], default=last_id)
-
+                if len(buffer) >= args.batch_size:
+                    flush()
+
+            if args.use_offset_pagination:
+                offset += args.limit
+            else:
+                last_id = max([r.get("id") for r in page if isinstance(r, dict) and isinstance(r.get("id"), int)], default=last_id)
+
+        flush()
+    finally:
+        executor.shutdown()
+        service.close()
     print(
         f"Done. processed={processed} updated={updated} skipped={skipped} failed={failed} dry_run={args.dry_run}"
     )
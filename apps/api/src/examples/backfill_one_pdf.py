@@ -10,10 +10,6 @@ Run from `apps/api`:
 
 import argparse
 
-from src.ingestion import IngestionService
-from src.oda import fetch_pdf_urls_for_sag
-from src.supabase_rest import fetch_proposal_by_id, update_proposal
-
 
 def main() -> None:
     parser = argparse.ArgumentParser()
@@ -22,7 +18,15 @@ def main() -> None:
     parser.add_argument("--force", action="store_true", help="Update even if pdfUrls already present")
     args = parser.parse_args()
 
-    row = fetch_proposal_by_id(args.proposal_id)
+    # Imported after argument parsing so `--help` and typos don't pay for loading the app modules.
+    from src.ingestion import IngestionService
+    from src.oda import fetch_pdf_urls_for_sag
+    from src.supabase_rest import fetch_proposals_page, update_proposal
+
+    # The whole raw_json is read and written back, so select it explicitly (fetch_proposal_by_id
+    # only projects the PDF links out of it).
+    rows = fetch_proposals_page(select="id,raw_json", limit=1, filters={"id": f"eq.{args.proposal_id}"})
+    row = rows[0] if rows else None
     if not row:
         raise SystemExit(f"Proposal not found: {args.proposal_id}")
 
@@ -13,66 +13,90 @@ Notes:
 """
 
 import argparse
-
-from src.policy_analysis import analyze_proposal_policy, policy_analysis_model_id, policy_analysis_prompt_version
-from src.supabase_rest import fetch_proposals_page, upsert_proposal_policy_analysis
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--limit", type=int, default=25)
-    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument(
+        "--start-after-id",
+        type=int,
+        default=0,
+        help="Keyset pagination start point (resume a previous run from its last id)",
+    )
     parser.add_argument("--max-rows", type=int, default=200)
     parser.add_argument("--rewrite-existing", action="store_true", default=False)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("ENRICH_CONCURRENCY", "8") or "8"),
+        help="Number of LLM calls in flight at once",
+    )
     args = parser.parse_args()
 
+    # Imported after argument parsing so `--help` and typos don't pay for loading the app modules.
+    from src.policy_analysis import analyze_proposal_policy, policy_analysis_model_id, policy_analysis_prompt_version
+    from src.supabase_rest import fetch_proposals_page, upsert_proposal_policy_analysis
+
     processed = 0
     updated = 0
     skipped = 0
 
-    offset = args.offset
-    while processed < args.max_rows:
-        page = fetch_proposals_page(
-            select="id,titel,resume,raw_json,proposal_policy_analyses(proposal_id)",
-            limit=args.limit,
-            offset=offset,
-            order="id.asc",
-        )
-        if not page:
-            break
-
-        for row in page:
-            if processed >= args.max_rows:
-                break
-            processed += 1
-
-            proposal_id = row.get("id")
-            if not isinstance(proposal_id, int):
-                skipped += 1
-                continue
-
-            existing = row.get("proposal_policy_analyses")
-            if (not args.rewrite_existing) and isinstance(existing, list) and existing:
-                skipped += 1
-                continue
-
-            analysis = analyze_proposal_policy(row)
-            if analysis is None:
-                skipped += 1
-                continue
-
-            upsert_proposal_policy_analysis(
-                {
-                    "proposal_id": proposal_id,
-                    "analysis": analysis,
-                    "model": policy_analysis_model_id(),
-                    "prompt_version": policy_analysis_prompt_version(),
-                }
+    last_id = args.start_after_id
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        while processed < args.max_rows:
+            page = fetch_proposals_page(
+                # Only the PDF links are used from raw_json; project them instead of the whole blob.
+                # Stored PDF text is used as-is, so only proposals without it fetch the PDF.
+                select=(
+                    "id,titel,resume,mainPdfUrl:raw_json->mainPdfUrl,pdfUrls:raw_json->pdfUrls,"
+                    "proposal_policy_analyses(proposal_id),proposal_pdf_texts(extracted_text)"
+                ),
+                limit=args.limit,
+                after_id=last_id,
             )
-            updated += 1
-            print(f"Updated policy analysis for proposal_id={proposal_id}")
+            if not page:
+                break
 
-        offset += args.limit
+            todo = []
+            for row in page:
+                if processed >= args.max_rows:
+                    break
+                processed += 1
+
+                proposal_id = row.get("id")
+                if not isinstance(proposal_id, int):
+                    skipped += 1
+                    continue
+
+                existing = row.get("proposal_policy_analyses")
+                if (not args.rewrite_existing) and isinstance(existing, list) and existing:
+                    skipped += 1
+                    continue
+
+                todo.append(row)
+
+            # The LLM round trip dominates, so run the page's analyses concurrently.
+            for row, analysis in zip(todo, executor.map(analyze_proposal_policy, todo)):
+                if analysis is None:
+                    skipped += 1
+                    continue
+
+                proposal_id = row["id"]
+                upsert_proposal_policy_analysis(
+                    {
+                        "proposal_id": proposal_id,
+                        "analysis": analysis,
+                        "model": policy_analysis_model_id(),
+                        "prompt_version": policy_analysis_prompt_version(),
+                    }
+                )
+                updated += 1
+                print(f"Updated policy analysis for proposal_id={proposal_id}")
+
+            last_id = max([r.get("id") for r in page if isinstance(r, dict) and isinstance(r.get("id"), int)], default=last_id)
 
     print({"processed": processed, "updated": updated, "skipped": skipped})
 
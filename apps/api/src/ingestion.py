@@ -4,9 +4,19 @@ Ingestion service for fetching proposals from Folketingets ODA API.
 
 import httpx
 import json
+import logging
+import math
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import orjson
+
 from .enrichment import should_enrich_proposal, enrich_proposal, create_or_update_label
 from .policy_analysis import (
     analyze_proposal_policy,
@@ -20,41 +30,157 @@ from .supabase_rest import (
     insert_ingestion_run,
     update_ingestion_run,
     upsert_proposal,
+    upsert_proposals_bulk,
     fetch_proposals_page,
     update_proposal,
     upsert_proposal_policy_analysis,
 )
 
+logger = logging.getLogger(__name__)
+
 ODA_BASE_URL = "https://oda.ft.dk/api"
 SAG_ENDPOINT = f"{ODA_BASE_URL}/Sag"
 BILL_TYPE_ID = 3
-PAGE_SIZE = 100
+# Round trips dominate /Sag fetch time, not payload size, so use the largest page ODA serves.
+# ODA currently caps `$top` at 100; pages beyond the first are fetched concurrently instead
+# (see `_fetch_sag_pages`). ODA_PAGE_SIZE can only lower it: the paging computes `$skip` offsets
+# and detects the last page from PAGE_SIZE, so a value above what ODA returns would skip rows.
+ODA_MAX_PAGE_SIZE = 100
+PAGE_SIZE = max(1, min(int(os.getenv("ODA_PAGE_SIZE", "100") or "100"), ODA_MAX_PAGE_SIZE))
+# `$skip` paging needs a stable order, but nothing downstream depends on it being by date (the
+# watermark is the run's start time). Sorting by the primary key is cheaper for ODA to serve;
+# ODA_ORDER_BY_UPDATED=true restores the old newest-first order.
+SAG_ORDER_BY = (
+    "opdateringsdato desc"
+    if os.getenv("ODA_ORDER_BY_UPDATED", "").strip().lower() in {"1", "true", "yes"}
+    else "id"
+)
+# Conditional GETs for /Sag pages: remember each page's ETag/Last-Modified and body so repeat
+# queries in this process (same filter, same $skip) can be answered by a 304. ODA_PAGE_CACHE_SIZE
+# bounds the number of pages kept; 0 disables it.
+PAGE_CACHE_SIZE = int(os.getenv("ODA_PAGE_CACHE_SIZE", "128") or "128")
+_page_cache: "OrderedDict[str, Tuple[Optional[str], Optional[str], bytes]]" = OrderedDict()
+_page_cache_lock = threading.Lock()
+
+# Rows per PostgREST bulk upsert in `run_ingestion`; keeps each request body a few MB at most.
+UPSERT_BATCH_SIZE = 500
 
 # Bills (Sag.typeid == 3) are treated as closed/irrelevant if any of these status IDs occur.
 # These are Folketinget ODA Sag.statusid values covering: vedtaget, forkastet, bortfaldet,
 # tilbagetaget/udgået, afsluttet/behandlet/foretaget/taget til efterretning, stadfæstet.
-CLOSED_STATUS_IDS = {
+CLOSED_STATUS_IDS = frozenset({
     1, 8, 10, 25, 44,  # vedtaget (various phases)
     29, 6, 9,          # forkastet
     22, 41, 43,        # bortfaldet / tilbagetaget / udgået
     14, 17, 27, 40,    # afsluttet / behandlet / foretaget / taget til efterretning
     38,                # stadfæstet
-}
+})
 
 # "Zombie" cleanup: very old bills that never progressed and are missing clear closure markers.
 # Default is 2018-01-01T00:00:00Z; override via ODA_OLD_BILL_CUTOFF_DATE.
 DEFAULT_OLD_BILL_CUTOFF_DATE_ISO = "2018-01-01T00:00:00Z"
 
+
+@dataclass(frozen=True)
+class IngestionSettings:
+    only_in_process: bool
+    fetch_pdf_urls: bool
+    doc_request_delay_ms: int
+    doc_request_retries: int
+    page_concurrency: int
+    pdf_concurrency: int
+    llm_concurrency: int
+    old_bill_cutoff_date: datetime
+
+
+def _env_flag(name: str, default: str = "") -> bool:
+    return os.getenv(name, default).strip().lower() in {"1", "true", "yes"}
+
+
+def _parse_aware_datetime(raw: str) -> datetime:
+    parsed = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+@lru_cache(maxsize=1)
+def get_ingestion_settings() -> IngestionSettings:
+    """
+    Read the ODA_* / LLM_CONCURRENCY ingestion env vars once per process.
+
+    Every IngestionService shares the result, so a run sees one consistent configuration even if
+    the environment changes underneath it. Call `reload_settings()` after changing env vars.
+    """
+    raw_cutoff = os.getenv("ODA_OLD_BILL_CUTOFF_DATE", DEFAULT_OLD_BILL_CUTOFF_DATE_ISO).strip()
+    try:
+        cutoff = _parse_aware_datetime(raw_cutoff)
+    except Exception:
+        # Keep ingestion robust even if an env var is misconfigured.
+        cutoff = _parse_aware_datetime(DEFAULT_OLD_BILL_CUTOFF_DATE_ISO)
+
+    return IngestionSettings(
+        only_in_process=_env_flag("ODA_ONLY_IN_PROCESS"),
+        fetch_pdf_urls=_env_flag("ODA_FETCH_PDF_URLS", "true"),
+        doc_request_delay_ms=int(os.getenv("ODA_DOC_REQUEST_DELAY_MS", "0") or "0"),
+        doc_request_retries=int(os.getenv("ODA_DOC_REQUEST_RETRIES", "2") or "2"),
+        page_concurrency=max(1, int(os.getenv("ODA_PAGE_CONCURRENCY", "4") or "4")),
+        pdf_concurrency=max(1, int(os.getenv("ODA_PDF_CONCURRENCY", "8") or "8")),
+        llm_concurrency=max(1, int(os.getenv("LLM_CONCURRENCY", "8") or "8")),
+        old_bill_cutoff_date=cutoff,
+    )
+
+
+def reload_settings() -> IngestionSettings:
+    get_ingestion_settings.cache_clear()
+    return get_ingestion_settings()
+
+
+def _is_naive_oda_timestamp(value: str) -> bool:
+    # ODA's usual shape: `YYYY-MM-DDTHH:MM:SS[.fff]`, UTC without an offset suffix.
+    return (
+        len(value) >= 19
+        and value[4] == "-"
+        and value[10] == "T"
+        and not value.endswith("Z")
+        and "+" not in value
+        and "-" not in value[10:]
+    )
+
+
 class IngestionService:
     def __init__(self, only_in_process: Optional[bool] = None):
-        self.client = httpx.Client(timeout=30.0)
+        # One long-lived pooled client per service: backfills make thousands of ODA calls, and
+        # keeping sockets warm (HTTP/2 multiplexes them further) avoids a handshake per request.
+        # The pool must cover page + PDF + LLM workers together (ODA_*_CONCURRENCY) or they queue
+        # on connections. Transport retries only cover connect failures; HTTP errors go through
+        # the 429/backoff handling in `oda`.
+        # (httpx ignores client-level http2/limits once a transport is passed, so set them there.)
+        self.client = httpx.Client(
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=2,
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            ),
+        )
+        settings = get_ingestion_settings()
         if only_in_process is None:
-            only_in_process = os.getenv("ODA_ONLY_IN_PROCESS", "").strip().lower() in {"1", "true", "yes"}
+            only_in_process = settings.only_in_process
         self.only_in_process = only_in_process
-        self.fetch_pdf_urls = os.getenv("ODA_FETCH_PDF_URLS", "true").strip().lower() in {"1", "true", "yes"}
-        self.doc_request_delay_ms = int(os.getenv("ODA_DOC_REQUEST_DELAY_MS", "0") or "0")
-        self.doc_request_retries = int(os.getenv("ODA_DOC_REQUEST_RETRIES", "2") or "2")
-        self.old_bill_cutoff_date = self._parse_env_cutoff_date()
+        self.fetch_pdf_urls = settings.fetch_pdf_urls
+        self.doc_request_delay_ms = settings.doc_request_delay_ms
+        self.doc_request_retries = settings.doc_request_retries
+        self.page_concurrency = settings.page_concurrency
+        self.pdf_concurrency = settings.pdf_concurrency
+        self.llm_concurrency = settings.llm_concurrency
+        self.old_bill_cutoff_date = settings.old_bill_cutoff_date
+        # Same naive-UTC layout ODA uses for `opdateringsdato`, so `is_closed` can compare strings.
+        # A zero fraction is dropped so "...T00:00:00" doesn't sort before "...T00:00:00.000".
+        self._old_bill_cutoff_oda = self._format_datetime_for_odata(self.old_bill_cutoff_date).removesuffix(".000")
+
+    def close(self) -> None:
+        self.client.close()
 
     def get_last_watermark(self) -> Optional[datetime]:
         """Get the last successful watermark from ingestion runs."""
@@ -69,28 +195,16 @@ class IngestionService:
         return millis
 
     def _parse_oda_datetime(self, value: str) -> str:
+        if _is_naive_oda_timestamp(value):
+            # Already ISO-8601 in UTC; just make the zone explicit instead of parsing and re-formatting.
+            return value + "+00:00"
         parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
         if parsed.tzinfo is None:
             parsed = parsed.replace(tzinfo=timezone.utc)
         return parsed.isoformat()
 
     def _parse_oda_datetime_to_dt(self, value: str) -> datetime:
-        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
-        if parsed.tzinfo is None:
-            parsed = parsed.replace(tzinfo=timezone.utc)
-        return parsed
-
-    def _parse_env_cutoff_date(self) -> datetime:
-        """
-        Parse ODA_OLD_BILL_CUTOFF_DATE into a timezone-aware datetime.
-        Falls back to DEFAULT_OLD_BILL_CUTOFF_DATE_ISO if missing/invalid.
-        """
-        raw = os.getenv("ODA_OLD_BILL_CUTOFF_DATE", DEFAULT_OLD_BILL_CUTOFF_DATE_ISO).strip()
-        try:
-            return self._parse_oda_datetime_to_dt(raw)
-        except Exception:
-            # Keep ingestion robust even if an env var is misconfigured.
-            return self._parse_oda_datetime_to_dt(DEFAULT_OLD_BILL_CUTOFF_DATE_ISO)
+        return _parse_aware_datetime(value)
 
     def is_closed(self, sag: Dict[str, Any]) -> bool:
         """
@@ -101,17 +215,19 @@ class IngestionService:
         2) CLOSED_STATUS_IDS captures known final statuses (vedtaget/forkastet/bortfaldet/etc.).
         3) A cutoff date filters out very old "zombie" bills that never progressed but clutter the DB.
         """
-        lovnummerdato = sag.get("lovnummerdato")
-        if isinstance(lovnummerdato, str) and lovnummerdato.strip():
+        # Cheapest checks first: this runs once per fetched Sag.
+        if sag.get("statusid") in CLOSED_STATUS_IDS:
             return True
 
-        statusid = sag.get("statusid")
-        if isinstance(statusid, int) and statusid in CLOSED_STATUS_IDS:
+        # ODA returns either None or a non-empty ISO string here.
+        if sag.get("lovnummerdato"):
             return True
 
-        typeid = sag.get("typeid")
         opdateringsdato = sag.get("opdateringsdato")
-        if typeid == BILL_TYPE_ID and isinstance(opdateringsdato, str):
+        if sag.get("typeid") == BILL_TYPE_ID and isinstance(opdateringsdato, str):
+            if _is_naive_oda_timestamp(opdateringsdato):
+                # Fixed-width ISO timestamps in the same zone order lexicographically.
+                return opdateringsdato < self._old_bill_cutoff_oda
             try:
                 if self._parse_oda_datetime_to_dt(opdateringsdato) < self.old_bill_cutoff_date:
                     return True
@@ -121,11 +237,18 @@ class IngestionService:
 
         return False
 
-    def _build_filter(self, since: Optional[datetime]) -> str:
+    def _build_filter(self, since: Optional[datetime], *, only_relevant: bool = False) -> str:
         filters = [f"typeid eq {BILL_TYPE_ID}"]
         if since:
             since_str = self._format_datetime_for_odata(since)
             filters.append(f"opdateringsdato gt datetime'{since_str}'")
+        if only_relevant:
+            # Mirror `is_closed` server-side so closed bills are never paged or parsed.
+            # `is_closed` is still applied afterwards as a defensive post-filter.
+            filters.append("lovnummerdato eq null")
+            filters.extend(f"statusid ne {sid}" for sid in sorted(CLOSED_STATUS_IDS))
+            cutoff_str = self._format_datetime_for_odata(self.old_bill_cutoff_date)
+            filters.append(f"opdateringsdato ge datetime'{cutoff_str}'")
         return " and ".join(filters)
 
     def fetch_proposals_since(
@@ -147,49 +270,135 @@ class IngestionService:
         Returns:
             List of proposal data from ODA API
         """
+        if only_relevant is None:
+            only_relevant = self.only_in_process
+
         try:
             params = {
                 "$format": "json",
-                "$orderby": "opdateringsdato desc",
+                "$orderby": SAG_ORDER_BY,
                 "$top": PAGE_SIZE,
-                "$filter": self._build_filter(since),
+                "$filter": self._build_filter(since, only_relevant=only_relevant),
             }
 
-            proposals: List[Dict[str, Any]] = []
-            skip = 0
-            while True:
-                params["$skip"] = skip
-                response = self.client.get(SAG_ENDPOINT, params=params)
-                response.raise_for_status()
-
-                data = response.json()
-                page = data.get("value", [])
-                if not page:
-                    break
-
-                proposals.extend(page)
-                skip += PAGE_SIZE
-
-            if only_relevant is None:
-                only_relevant = self.only_in_process
-            if only_relevant:
-                proposals = [s for s in proposals if not self.is_closed(s)]
+            # Closed bills are dropped page by page rather than after the whole set is in memory.
+            keep = (lambda s: not self.is_closed(s)) if only_relevant else None
+            if include_pdfs and self.fetch_pdf_urls:
+                # Start PDF resolution as each page lands instead of after the whole listing;
+                # leaving the `with` block waits for the outstanding Sager.
+                with ThreadPoolExecutor(max_workers=self.pdf_concurrency) as pdf_executor:
+                    proposals = self._fetch_sag_pages(
+                        params,
+                        keep,
+                        on_page=lambda page: [
+                            pdf_executor.submit(self._enrich_sag_with_pdf_urls, sag) for sag in page
+                        ],
+                    )
+            else:
+                proposals = self._fetch_sag_pages(params, keep)
 
-            print(f"Fetched {len(proposals)} proposals from ODA API")
-            if include_pdfs:
-                self._enrich_proposals_with_pdf_urls(proposals)
+            logger.info("Fetched %d proposals from ODA API", len(proposals))
             return proposals
 
         except httpx.HTTPError as e:
             raise Exception(f"Failed to fetch from ODA API: {e}")
 
+    def _get_sag_page(self, base_url: str, skip: int) -> Dict[str, Any]:
+        # `base_url` already carries the encoded filter/order/top; only `$skip` differs per page.
+        key = f"{base_url}&%24skip={skip}"
+        headers: Dict[str, str] = {}
+        cached = None
+        if PAGE_CACHE_SIZE > 0:
+            with _page_cache_lock:
+                cached = _page_cache.get(key)
+                if cached is not None:
+                    _page_cache.move_to_end(key)
+            if cached is not None:
+                etag, last_modified, _ = cached
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+
+        response = self.client.get(key, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            return orjson.loads(cached[2])
+        response.raise_for_status()
+
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if PAGE_CACHE_SIZE > 0 and (etag or last_modified):
+            with _page_cache_lock:
+                _page_cache[key] = (etag, last_modified, response.content)
+                _page_cache.move_to_end(key)
+                while len(_page_cache) > PAGE_CACHE_SIZE:
+                    _page_cache.popitem(last=False)
+        return orjson.loads(response.content)
+
+    def _fetch_sag_pages(
+        self,
+        params: Dict[str, Any],
+        keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        on_page: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch every /Sag page for `params`.
+
+        The first page asks for `$inlinecount=allpages`, so we know the total up front and can
+        fetch the remaining pages concurrently (bounded by ODA_PAGE_CONCURRENCY) instead of one
+        round trip at a time. Results keep the `$skip` order. Without a count we fall back to
+        paging sequentially until a short page.
+
+        `keep` is applied per page as it arrives, so rejected rows never accumulate in the result.
+        `on_page` is called with each page's kept rows as soon as they are available.
+        """
+        # Encode the shared query once instead of re-serializing the params dict for every page.
+        base_url = f"{SAG_ENDPOINT}?{httpx.QueryParams(params)}"
+        first = self._get_sag_page(f"{base_url}&%24inlinecount=allpages", 0)
+        first_page = first.get("value", []) or []
+        if not first_page:
+            return []
+        proposals: List[Dict[str, Any]] = []
+
+        def add(page: List[Dict[str, Any]]) -> None:
+            if keep is not None:
+                page = [s for s in page if keep(s)]
+            proposals.extend(page)
+            if on_page is not None and page:
+                on_page(page)
+
+        add(first_page)
+
+        try:
+            total = int(first.get("odata.count"))
+        except (TypeError, ValueError):
+            total = None
+
+        skip = PAGE_SIZE
+        last_page_size = len(first_page)
+        if total is not None:
+            skips = [i * PAGE_SIZE for i in range(1, math.ceil(total / PAGE_SIZE))]
+            if skips:
+                with ThreadPoolExecutor(max_workers=min(self.page_concurrency, len(skips))) as executor:
+                    for data in executor.map(lambda s: self._get_sag_page(base_url, s), skips):
+                        page = data.get("value", []) or []
+                        add(page)
+                        last_page_size = len(page)
+                skip = skips[-1] + PAGE_SIZE
+
+        # Sequential tail: no count available, or rows were added after the count was taken.
+        while last_page_size >= PAGE_SIZE:
+            page = self._get_sag_page(base_url, skip).get("value", []) or []
+            add(page)
+            last_page_size = len(page)
+            skip += PAGE_SIZE
+        return proposals
+
     def fetch_active_bills_with_pdfs(self) -> List[Dict[str, Any]]:
         """
         Convenience wrapper to fetch all non-closed bills (per `is_closed`) enriched with PDFs.
         """
-        bills = self.fetch_proposals_since(None, include_pdfs=False, only_relevant=True)
-        self._enrich_proposals_with_pdf_urls(bills)
-        return bills
+        return self.fetch_proposals_since(None, include_pdfs=True, only_relevant=True)
 
     def _enrich_proposals_with_pdf_urls(self, proposals: List[Dict[str, Any]]) -> None:
         """
@@ -202,27 +411,33 @@ class IngestionService:
         We identify the main law-text document by (Dokument.typeid == 21 OR Dokument.kategoriid == 31),
         and we filter Fil entries by format == "PDF".
         """
-        if not self.fetch_pdf_urls:
+        if not self.fetch_pdf_urls or not proposals:
             return
 
-        for sag in proposals:
-            try:
-                result = fetch_pdf_urls_for_sag(
-                    self.client,
-                    sag,
-                    delay_ms=self.doc_request_delay_ms,
-                    max_retries=self.doc_request_retries,
-                )
-                sag["mainPdfUrl"] = result.get("mainPdfUrl")
-                sag["pdfUrls"] = result.get("pdfUrls", [])
-                # Keep some lightweight debug metadata for future refinement (optional).
-                sag["pdfDocuments"] = result.get("documents", [])
-            except Exception as e:
-                sag_id = sag.get("id")
-                print(f"Warning: failed to fetch PDFs for Sag {sag_id}: {e}")
-                sag["mainPdfUrl"] = None
-                sag["pdfUrls"] = []
-                sag["pdfDocuments"] = []
+        # Each Sag is a dependent chain of ODA calls; run several Sager at once (ODA_PDF_CONCURRENCY).
+        # The per-call delay and 429 backoff in `oda` still apply within each worker.
+        with ThreadPoolExecutor(max_workers=min(self.pdf_concurrency, len(proposals))) as executor:
+            list(executor.map(self._enrich_sag_with_pdf_urls, proposals))
+
+    def _enrich_sag_with_pdf_urls(self, sag: Dict[str, Any]) -> None:
+        """Resolve PDFs for one Sag in place; failures are logged and leave empty fields."""
+        try:
+            result = fetch_pdf_urls_for_sag(
+                self.client,
+                sag,
+                delay_ms=self.doc_request_delay_ms,
+                max_retries=self.doc_request_retries,
+            )
+            sag["mainPdfUrl"] = result.get("mainPdfUrl")
+            sag["pdfUrls"] = result.get("pdfUrls", [])
+            # Keep some lightweight debug metadata for future refinement (optional).
+            sag["pdfDocuments"] = result.get("documents", [])
+        except Exception as e:
+            sag_id = sag.get("id")
+            logger.warning("Failed to fetch PDFs for Sag %s: %s", sag_id, e)
+            sag["mainPdfUrl"] = None
+            sag["pdfUrls"] = []
+            sag["pdfDocuments"] = []
 
     def upsert_proposal(self, proposal_data: Dict[str, Any]) -> bool:
         """
@@ -235,10 +450,20 @@ class IngestionService:
         Returns:
             bool: True if proposal was updated/inserted
         """
+        proposal_dict = self._proposal_row(proposal_data)
+        if proposal_dict is None:
+            return False
+
+        upsert_proposal(proposal_dict)
+        logger.debug("Upserted proposal %s", proposal_dict["id"])
+        return True
+
+    def _proposal_row(self, proposal_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Map an ODA Sag to a `proposals` row, or None if it has no ID."""
         proposal_id = proposal_data.get("id")
         if not proposal_id:
-            print(f"Skipping proposal without ID: {proposal_data}")
-            return False
+            logger.warning("Skipping proposal without ID: %s", proposal_data)
+            return None
 
         # Prepare proposal data
         nummerprefix = proposal_data.get("nummerprefix") or "L"
@@ -253,10 +478,44 @@ class IngestionService:
             "opdateringsdato": self._parse_oda_datetime(proposal_data["opdateringsdato"]),
             "raw_json": proposal_data
         }
+        return proposal_dict
 
-        upsert_proposal(proposal_dict)
-        print(f"Upserted proposal {proposal_id}")
-        return True
+    def _upsert_proposals(self, proposals: List[Dict[str, Any]]) -> Set[int]:
+        """
+        Upsert proposals in batches of UPSERT_BATCH_SIZE rows per request.
+
+        A batch that fails is retried row by row so one bad Sag doesn't drop its neighbours.
+
+        Returns:
+            IDs of the proposals that were written.
+        """
+        rows = []
+        for proposal_data in proposals:
+            try:
+                row = self._proposal_row(proposal_data)
+            except Exception as e:
+                logger.error("Error processing proposal %s: %s", proposal_data.get("id"), e)
+                continue
+            if row is not None:
+                rows.append(row)
+
+        written: Set[int] = set()
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            try:
+                upsert_proposals_bulk(batch)
+                written.update(row["id"] for row in batch)
+                logger.debug("Upserted %d proposals", len(batch))
+                continue
+            except Exception as e:
+                logger.warning("Bulk upsert of %d proposals failed, retrying one by one: %s", len(batch), e)
+            for row in batch:
+                try:
+                    upsert_proposal(row)
+                    written.add(row["id"])
+                except Exception as e:
+                    logger.error("Error processing proposal %s: %s", row["id"], e)
+        return written
 
     def backfill_pdf_urls_for_existing_proposals(
         self,
@@ -277,54 +536,105 @@ class IngestionService:
         updated = 0
         skipped = 0
 
-        while True:
-            if max_rows is not None and processed >= max_rows:
-                break
-
-            page = fetch_proposals_page(
+        def read_page(after_id: Optional[int]) -> List[Dict[str, Any]]:
+            # `offset` only positions the first page; later pages continue after the last id seen.
+            return fetch_proposals_page(
                 select="id,raw_json",
                 limit=limit,
-                offset=offset,
+                offset=offset if after_id is None else 0,
+                after_id=after_id,
             )
-            if not page:
-                break
 
-            for row in page:
+        def backfill(item: Tuple[int, Dict[str, Any]]) -> bool:
+            proposal_id, raw_json = item
+            try:
+                result = fetch_pdf_urls_for_sag(
+                    self.client,
+                    {"id": proposal_id},
+                    delay_ms=self.doc_request_delay_ms,
+                    max_retries=self.doc_request_retries,
+                )
+                raw_json["mainPdfUrl"] = result.get("mainPdfUrl")
+                raw_json["pdfUrls"] = result.get("pdfUrls", [])
+                raw_json["pdfDocuments"] = result.get("documents", [])
+                update_proposal(proposal_id, {"raw_json": raw_json})
+                return True
+            except Exception as e:
+                logger.warning("Failed to backfill PDFs for proposal %s: %s", proposal_id, e)
+                return False
+
+        # Pipelined: the next Supabase page is read while the current page's Sager are resolved
+        # against ODA, ODA_PDF_CONCURRENCY at a time.
+        with ThreadPoolExecutor(max_workers=1) as reader, ThreadPoolExecutor(
+            max_workers=self.pdf_concurrency
+        ) as workers:
+            next_page = reader.submit(read_page, None)
+            while True:
                 if max_rows is not None and processed >= max_rows:
                     break
-                processed += 1
 
-                proposal_id = row.get("id")
-                raw_json = row.get("raw_json") or {}
-                if not isinstance(raw_json, dict) or not proposal_id:
-                    skipped += 1
-                    continue
+                page = next_page.result()
+                if not page:
+                    break
+                next_page = reader.submit(read_page, page[-1]["id"])
 
-                existing = raw_json.get("pdfUrls")
-                if only_missing and isinstance(existing, list) and existing:
-                    skipped += 1
-                    continue
+                todo: List[Tuple[int, Dict[str, Any]]] = []
+                for row in page:
+                    if max_rows is not None and processed >= max_rows:
+                        break
+                    processed += 1
 
-                try:
-                    result = fetch_pdf_urls_for_sag(
-                        self.client,
-                        {"id": proposal_id},
-                        delay_ms=self.doc_request_delay_ms,
-                        max_retries=self.doc_request_retries,
-                    )
-                    raw_json["mainPdfUrl"] = result.get("mainPdfUrl")
-                    raw_json["pdfUrls"] = result.get("pdfUrls", [])
-                    raw_json["pdfDocuments"] = result.get("documents", [])
-                    update_proposal(proposal_id, {"raw_json": raw_json})
-                    updated += 1
-                except Exception as e:
-                    print(f"Warning: failed to backfill PDFs for proposal {proposal_id}: {e}")
-                    continue
+                    proposal_id = row.get("id")
+                    raw_json = row.get("raw_json") or {}
+                    if not isinstance(raw_json, dict) or not proposal_id:
+                        skipped += 1
+                        continue
+
+                    existing = raw_json.get("pdfUrls")
+                    if only_missing and isinstance(existing, list) and existing:
+                        skipped += 1
+                        continue
+
+                    todo.append((proposal_id, raw_json))
 
-            offset += limit
+                updated += sum(workers.map(backfill, todo))
 
         return {"processed": processed, "updated": updated, "skipped": skipped}
 
+    def _process_proposal(self, proposal_data: Dict[str, Any]) -> bool:
+        """
+        Run the enrichment steps for one already upserted proposal.
+
+        Returns:
+            Whether IT labels were written, for the run counters. Never raises.
+        """
+        enriched = False
+        try:
+            # IT enrichment (existing)
+            if should_enrich_proposal(proposal_data):
+                logger.debug("Enriching proposal %s", proposal_data.get("id"))
+                enrichment_result = enrich_proposal(proposal_data)
+                if enrichment_result:
+                    create_or_update_label(proposal_data["id"], enrichment_result)
+                    enriched = True
+
+            # Optional: policy/democracy analysis (stored separately from IT labels).
+            if policy_analysis_enabled():
+                analysis = analyze_proposal_policy(proposal_data)
+                if analysis is not None:
+                    upsert_proposal_policy_analysis(
+                        {
+                            "proposal_id": proposal_data["id"],
+                            "analysis": analysis,
+                            "model": policy_analysis_model_id(),
+                            "prompt_version": policy_analysis_prompt_version(),
+                        }
+                    )
+
+        except Exception as e:
+            logger.error("Error processing proposal %s: %s", proposal_data.get("id"), e)
+        return enriched
+
     def run_ingestion(self) -> Dict[str, Any]:
         """
         Run the complete ingestion process.
@@ -361,49 +671,29 @@ class IngestionService:
                     continue
                 relevant.append(sag)
 
-            print(
-                "ODA /Sag fetched="
-                f"{fetched_count} relevant={len(relevant)} skipped_closed={skipped_closed_count}"
+            logger.info(
+                "ODA /Sag fetched=%d relevant=%d skipped_closed=%d",
+                fetched_count,
+                len(relevant),
+                skipped_closed_count,
             )
 
             # Enrich only relevant proposals with PDFs (optional).
             self._enrich_proposals_with_pdf_urls(relevant)
 
-            # Process proposals
-            updated_count = 0
-            enriched_count = 0
-
-            for proposal_data in relevant:
-                try:
-                    # Upsert proposal
-                    updated = self.upsert_proposal(proposal_data)
-                    if updated:
-                        updated_count += 1
-
-                    # IT enrichment (existing)
-                    if should_enrich_proposal(proposal_data):
-                        print(f"Enriching proposal {proposal_data.get('id')}")
-                        enrichment_result = enrich_proposal(proposal_data)
-                        if enrichment_result:
-                            create_or_update_label(proposal_data["id"], enrichment_result)
-                            enriched_count += 1
-
-                    # Optional: policy/democracy analysis (stored separately from IT labels).
-                    if policy_analysis_enabled():
-                        analysis = analyze_proposal_policy(proposal_data)
-                        if analysis is not None:
-                            upsert_proposal_policy_analysis(
-                                {
-                                    "proposal_id": proposal_data["id"],
-                                    "analysis": analysis,
-                                    "model": policy_analysis_model_id(),
-                                    "prompt_version": policy_analysis_prompt_version(),
-                                }
-                            )
+            # Write all proposals up front in a few bulk requests, then enrich the ones that landed
+            # (labels reference the proposal row).
+            written_ids = self._upsert_proposals(relevant)
+            updated_count = len(written_ids)
+            to_enrich = [sag for sag in relevant if sag.get("id") in written_ids]
 
-                except Exception as e:
-                    print(f"Error processing proposal {proposal_data.get('id')}: {e}")
-                    continue
+            # Each proposal is dominated by LLM round trips, so process several at once
+            # (LLM_CONCURRENCY). Failures stay isolated per proposal.
+            enriched_count = 0
+            if to_enrich:
+                with ThreadPoolExecutor(max_workers=min(self.llm_concurrency, len(to_enrich))) as executor:
+                    for enriched in executor.map(self._process_proposal, to_enrich):
+                        enriched_count += int(enriched)
 
             # Update run record
             finished_at = datetime.now(timezone.utc)
@@ -429,7 +719,7 @@ class IngestionService:
                 "duration_seconds": duration
             }
 
-            print(f"Ingestion completed: {result}")
+            logger.info("Ingestion completed: %s", result)
             return result
 
         except Exception as e:
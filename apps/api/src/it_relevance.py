@@ -3,6 +3,8 @@ IT relevance heuristic for Danish parliamentary proposals.
 Uses keyword matching to determine if a proposal is IT-relevant.
 """
 
+import re
+
 IT_KEYWORDS = {
     # Danish IT terms
     "it", "digital", "internet", "software", "hardware", "computer", "computere",
@@ -37,6 +39,28 @@ IT_KEYWORDS = {
     "amazon", "microsoft", "apple", "tech-giganter", "tech giganter"
 }
 
+# Very short keywords ("it", "ai", "5g", ...) are only counted as whole words; as plain
+# substrings they match inside ordinary Danish words ("kredit", "maj", ...). Longer keywords
+# keep substring matching so Danish compounds ("digitaliseringsstyrelsen") still count.
+SHORT_KEYWORD_MAX_LEN = 3
+
+
+def _keyword_pattern(keyword: str) -> str:
+    escaped = re.escape(keyword)
+    if len(keyword) <= SHORT_KEYWORD_MAX_LEN:
+        return rf"(?<!\w){escaped}(?!\w)"
+    return escaped
+
+
+# Compiled once into a single alternation: SRE scans the text in one pass instead of one
+# substring search per keyword, and IGNORECASE saves lowercasing a copy of the text.
+# Longest keywords come first so e.g. "kunstig intelligens" wins over "ai" at the same spot.
+_IT_RE = re.compile(
+    "|".join(_keyword_pattern(k) for k in sorted(IT_KEYWORDS, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+
 def is_it_relevant(text: str) -> bool:
     """
     Determine if a proposal text is IT-relevant based on keyword matching.
@@ -50,15 +74,15 @@ def is_it_relevant(text: str) -> bool:
     if not text:
         return False
 
-    text_lower = text.lower()
-
-    # Check if any IT keywords appear in the text
-    return any(keyword in text_lower for keyword in IT_KEYWORDS)
+    # Stops at the first IT keyword found
+    return _IT_RE.search(text) is not None
 
 def extract_it_topics(text: str) -> list[str]:
     """
     Extract IT topics from text based on keyword matching.
 
+    Overlapping keywords report the longest match only (e.g. "digitalisering", not also "digital").
+
     Args:
         text: The text to analyze
 
@@ -68,12 +92,15 @@ def extract_it_topics(text: str) -> list[str]:
     if not text:
         return []
 
-    text_lower = text.lower()
-    matched_topics = []
+    # Remove duplicates and return
+    return list({m.group(0).lower() for m in _IT_RE.finditer(text)})
 
-    for keyword in IT_KEYWORDS:
-        if keyword in text_lower:
-            matched_topics.append(keyword)
+def scan_it_relevance(text: str) -> tuple[bool, list[str]]:
+    """
+    `is_it_relevant` and `extract_it_topics` in one pass over the text.
 
-    # Remove duplicates and return
-    return list(set(matched_topics))
+    Returns:
+        tuple[bool, list[str]]: (is IT-relevant, matched IT keywords/topics)
+    """
+    topics = extract_it_topics(text)
+    return bool(topics), topics
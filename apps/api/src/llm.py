@@ -1,12 +1,24 @@
 from __future__ import annotations
 
-import json
 import os
 import re
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
-from openai import OpenAI
+import orjson
+from openai import APIConnectionError, APIStatusError, OpenAI
+
+from .config import load_env
+
+load_env()
+
+# Read once; these don't change at runtime.
+LLM_TOP_P = float(os.getenv("LLM_TOP_P", "1") or "1")
+LLM_JSON_MODE = (os.getenv("LLM_JSON_MODE") or "on").strip().lower() not in {"0", "false", "no", "off"}
+# The OpenAI SDK retries connection errors, timeouts, 408/409/429 and 5xx itself, with exponential
+# backoff + jitter and Retry-After; other errors (bad request/schema, auth) are raised at once.
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3") or "3")
 
 
 @dataclass(frozen=True)
@@ -24,10 +36,13 @@ def _env_bool(name: str, default: bool) -> bool:
     return raw.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
+@lru_cache(maxsize=1)
 def get_llm_config() -> Optional[LlmConfig]:
     """
     Returns:
         LlmConfig if a provider is configured, else None.
+
+    Cached for the process lifetime; call `get_llm_config.cache_clear()` after changing env vars.
     """
     openai_key = (os.getenv("OPENAI_API_KEY") or "").strip()
     if not openai_key:
@@ -42,6 +57,63 @@ def get_llm_config() -> Optional[LlmConfig]:
     )
 
 
+@lru_cache(maxsize=4)
+def _get_client(api_key: str, base_url: Optional[str]) -> OpenAI:
+    # Reusing the client keeps its HTTP connection pool (and TLS sessions) warm across calls.
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=LLM_MAX_RETRIES)
+
+
+def is_transient_llm_error(exc: BaseException) -> bool:
+    """
+    Whether `exc` is a provider-side failure (rate limit, 5xx, timeout, connection) that may
+    succeed if the call is re-run later, as opposed to one that would fail the same way again
+    (rejected request/schema, auth, refusal, truncated output).
+    """
+    if isinstance(exc, APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return False
+
+
+_JSON_STRUCTURAL_RE = re.compile(r'[{}"\\]')
+
+
+def _find_json_object_span(text: str) -> Optional[Tuple[int, int]]:
+    """
+    Returns (start, end) of the first balanced `{...}` in `text`, or None.
+
+    Single forward pass that tracks brace depth and skips braces inside JSON strings; only the
+    structural characters are visited, so ordinary text is skipped at regex-engine speed.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped_at = -1
+    for match in _JSON_STRUCTURAL_RE.finditer(text, start):
+        i = match.start()
+        if i == escaped_at:
+            continue
+        ch = match.group()
+        if in_string:
+            if ch == "\\":
+                escaped_at = i + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return start, i + 1
+    return None
+
+
 def _extract_first_json_object(text: str) -> Dict[str, Any]:
     """
     Attempts to parse a JSON object from a model response.
@@ -51,20 +123,22 @@ def _extract_first_json_object(text: str) -> Dict[str, Any]:
     if not text:
         raise ValueError("Empty model response")
 
-    # Fast path: the entire response is JSON.
-    try:
-        value = json.loads(text)
-        if isinstance(value, dict):
-            return value
-    except Exception:
-        pass
-
-    # Fallback: pull the first {...} block. This is robust against models adding prose.
-    match = re.search(r"\{[\s\S]*\}", text)
-    if not match:
+    # Fast path: the entire response is JSON. Only attempted when it can be an object, so
+    # prose-wrapped responses don't pay for a failed parse first.
+    if text[0] == "{" and text[-1] == "}":
+        try:
+            value = orjson.loads(text)
+            if isinstance(value, dict):
+                return value
+        except orjson.JSONDecodeError:
+            pass
+
+    # Fallback: pull the first balanced {...} block. This is robust against models adding prose.
+    span = _find_json_object_span(text)
+    if span is None:
         raise ValueError("No JSON object found in response")
 
-    value = json.loads(match.group(0))
+    value = orjson.loads(text[span[0] : span[1]])
     if not isinstance(value, dict):
         raise ValueError("Parsed JSON was not an object")
     return value
@@ -87,16 +161,16 @@ def chat_json(
     if not config:
         raise RuntimeError("No OpenAI API key configured (set OPENAI_API_KEY)")
 
-    client = OpenAI(api_key=config.api_key, base_url=config.base_url)
+    client = _get_client(config.api_key, config.base_url)
 
-    use_json_mode = (os.getenv("LLM_JSON_MODE") or "on").strip().lower() not in {"0", "false", "no", "off"}
+    use_json_mode = LLM_JSON_MODE
 
     def _create_completion(response_format: Optional[Dict[str, str]]):
         kwargs: Dict[str, Any] = {
             "model": config.model,
             "messages": messages,
             "temperature": temperature,
-            "top_p": float(os.getenv("LLM_TOP_P", "1") or "1"),
+            "top_p": LLM_TOP_P,
         }
         if response_format:
             kwargs["response_format"] = response_format
@@ -131,7 +205,7 @@ def chat_json_schema(
     if not config:
         raise RuntimeError("No OpenAI API key configured (set OPENAI_API_KEY)")
 
-    client = OpenAI(api_key=config.api_key, base_url=config.base_url)
+    client = _get_client(config.api_key, config.base_url)
 
     response_format: Dict[str, Any] = {
         "type": "json_schema",
@@ -148,7 +222,7 @@ def chat_json_schema(
         model=config.model,
         messages=messages,
         temperature=temperature,
-        top_p=float(os.getenv("LLM_TOP_P", "1") or "1"),
+        top_p=LLM_TOP_P,
         response_format=response_format,
     )
 
@@ -161,7 +235,7 @@ def chat_json_schema(
     content = (choice.message.content or "").strip()
     if not content:
         raise ValueError("Empty model response")
-    return json.loads(content)
+    return orjson.loads(content)
 
 
 def llm_enabled() -> bool:
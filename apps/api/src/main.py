@@ -6,25 +6,50 @@ from .config import load_env
 
 load_env()
 
-from fastapi import FastAPI, Depends, HTTPException, Query
+import logging
+import os
+
+# Ingestion logs per-proposal detail at DEBUG; LOG_LEVEL=DEBUG brings it back.
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+# httpx logs every request at INFO; keep that for LOG_LEVEL=DEBUG.
+if logging.getLogger().getEffectiveLevel() > logging.DEBUG:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi import UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-import os
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import TypeAdapter, ValidationError
+import orjson
+from typing import List, Optional, Tuple
+import base64
+import binascii
 import hashlib
-from datetime import datetime, timezone
-
-from .supabase_rest import fetch_proposals, fetch_proposal_by_id, upsert_proposal_pdf_text, upsert_proposal_policy_analysis
+from datetime import datetime
+
+from .supabase_rest import (
+    close_async_client as close_supabase_client,
+    fetch_proposals_async,
+    fetch_proposal_by_id,
+    upsert_proposal_pdf_text_and_policy,
+    upsert_proposal_policy_analysis,
+)
 from .schemas import ProposalWithLabel, IngestResponse, ProposalsQuery
 from .ingestion import IngestionService
 from .pdf_text import extract_text_from_pdf_bytes
 from .policy_analysis import analyze_proposal_policy, policy_analysis_model_id, policy_analysis_prompt_version
-from .auth import require_admin
+from .auth import require_admin, close_client as close_auth_client
 
 app = FastAPI(
     title="IT-Politics Bill Radar API",
     description="API for tracking Danish parliamentary proposals with IT relevance",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -34,12 +59,87 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+@app.exception_handler(ValidationError)
+async def _query_model_validation_error(request: Request, exc: ValidationError):
+    # `ProposalsQuery = Depends()` is built by calling the model, so its Field bounds (limit,
+    # offset) fail as a plain pydantic error; answer 422 like FastAPI's own query validation.
+    # Any other ValidationError is a server-side bug and stays a 500.
+    if exc.title != ProposalsQuery.__name__:
+        raise exc
+    return ORJSONResponse(status_code=422, content={"detail": jsonable_encoder(exc.errors(include_url=False))})
+
+
+# Handlers below validate DB rows into ProposalWithLabel once and return the serialized JSON
+# themselves. Returning a Response makes FastAPI skip re-validating against `response_model`,
+# which stays on the route for the OpenAPI schema.
+_PROPOSAL_LIST = TypeAdapter(List[ProposalWithLabel])
+
+
+def _json_response(content: bytes, headers: Optional[dict] = None) -> Response:
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def _encode_cursor(row: dict) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([row["opdateringsdato"], row["id"]])).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        opdateringsdato, proposal_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        # Round-trip the timestamp so only a well-formed value reaches the PostgREST filter.
+        opdateringsdato = datetime.fromisoformat(opdateringsdato.replace("Z", "+00:00")).isoformat()
+        return opdateringsdato, int(proposal_id)
+    except (binascii.Error, orjson.JSONDecodeError, AttributeError, TypeError, ValueError, UnicodeEncodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _first(value):
+    # One-to-one embeds come back as a list or an object depending on the PostgREST version.
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _expand_row(row: dict) -> ProposalWithLabel:
+    """
+    Turn a proposals row with embedded label/policy/pdf-text into ProposalWithLabel.
+
+    PDF URLs come from the `mainPdfUrl`/`pdfUrls` keys that list reads project out of raw_json,
+    or from raw_json itself when the full row was selected.
+    """
+    row["label"] = _first(row.pop("proposal_labels", None))
+    row["policy"] = _first(row.pop("proposal_policy_analyses", None))
+    row["pdfText"] = _first(row.pop("proposal_pdf_texts", None))
+
+    raw_json = row.pop("raw_json", None)
+    source = raw_json if isinstance(raw_json, dict) else row
+    main_pdf_url = source.get("mainPdfUrl")
+    pdf_urls = source.get("pdfUrls")
+    row["mainPdfUrl"] = main_pdf_url if isinstance(main_pdf_url, str) else None
+    row["pdfUrls"] = [u for u in pdf_urls if isinstance(u, str)] if isinstance(pdf_urls, list) else []
+    return ProposalWithLabel(**row)
+
+
+@app.on_event("shutdown")
+async def _close_http_clients() -> None:
+    await close_auth_client()
+    await close_supabase_client()
+
 INGEST_TOKEN = os.getenv("INGEST_TOKEN")
 if not INGEST_TOKEN:
     raise ValueError("INGEST_TOKEN environment variable is required")
 
+# Upload/analysis settings; read once at startup.
+PDF_UPLOAD_MAX_MB = int(os.getenv("PDF_UPLOAD_MAX_MB", "25") or "25")
+PDF_UPLOAD_MAX_BYTES = PDF_UPLOAD_MAX_MB * 1024 * 1024
+UPLOAD_READ_CHUNK_BYTES = 1024 * 1024
+ENRICH_PDF_MAX_PAGES = int(os.getenv("ENRICH_PDF_MAX_PAGES", "25") or "25")
+PDF_TEXT_MAX_CHARS = int(os.getenv("PDF_TEXT_MAX_CHARS", "200000") or "200000")
+ENRICH_POLICY_ANALYSIS_ENABLED = os.getenv("ENRICH_POLICY_ANALYSIS", "").strip().lower() in {"1", "true", "yes", "y", "on"}
+
 @app.get("/")
 def read_root():
     """Health check endpoint."""
@@ -82,7 +182,7 @@ async def admin_ingest_proposals(
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
 
 @app.get("/proposals", response_model=List[ProposalWithLabel])
-def get_proposals(
+async def get_proposals(
     query: ProposalsQuery = Depends()
 ):
     """
@@ -91,165 +191,40 @@ def get_proposals(
     Query parameters:
     - type: Filter by proposal type ("L" for lovforslag, "B" for beslutningsforslag)
     - it_relevant: Filter by IT relevance (true/false)
-    - topic: Filter by IT topic (searches in it_topics array)
+    - topic: Filter by topic (IT topics and policy-analysis tags, case-insensitive)
+    - has_pdf_link / has_pdf_text / has_policy_analysis: Filter on what is attached (true/false)
     - limit: Maximum number of results (1-1000, default 50)
-    - offset: Pagination offset (default 0)
+    - offset: Pagination offset (0-1000, default 0); not combinable with `cursor`
+    - cursor: Continue after a previous page; full pages return the next one in `X-Next-Cursor`.
+      Prefer this over offsets.
     """
+    if query.cursor and query.offset:
+        # The cursor already positions the page; an offset on top would silently skip rows.
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+    after = _decode_cursor(query.cursor) if query.cursor else None
     try:
         if query.q:
             print(f"/proposals search q={query.q!r} offset={query.offset} limit={query.limit} topic={query.topic!r}")
-        needs_admin_flags = any(
-            v is not None
-            for v in (query.has_pdf_link, query.has_pdf_text, query.has_policy_analysis)
-        )
 
-        def row_to_result(row: dict) -> ProposalWithLabel:
-            label_data = row.pop("proposal_labels", None)
-            if isinstance(label_data, list):
-                label_data = label_data[0] if label_data else None
-            row["label"] = label_data
-
-            policy_data = row.pop("proposal_policy_analyses", None)
-            if isinstance(policy_data, list):
-                policy_data = policy_data[0] if policy_data else None
-            row["policy"] = policy_data
-
-            pdf_text_data = row.pop("proposal_pdf_texts", None)
-            if isinstance(pdf_text_data, list):
-                pdf_text_data = pdf_text_data[0] if pdf_text_data else None
-            row["pdfText"] = pdf_text_data
-
-            raw_json = row.get("raw_json") or {}
-            if isinstance(raw_json, dict):
-                main_pdf_url = raw_json.get("mainPdfUrl")
-                row["mainPdfUrl"] = main_pdf_url if isinstance(main_pdf_url, str) else None
-                pdf_urls = raw_json.get("pdfUrls")
-                row["pdfUrls"] = [u for u in pdf_urls if isinstance(u, str)] if isinstance(pdf_urls, list) else []
-
-            return ProposalWithLabel(**row)
-
-        def extract_policy_tags(result: ProposalWithLabel) -> List[str]:
-            policy = result.policy
-            if not policy or not isinstance(policy.analysis, dict):
-                return []
-            tags: List[str] = []
-            raw_tags = policy.analysis.get("tags")
-            if isinstance(raw_tags, list):
-                for item in raw_tags:
-                    if isinstance(item, str):
-                        tags.append(item)
-                    elif isinstance(item, dict):
-                        tag = item.get("tag")
-                        if isinstance(tag, str):
-                            tags.append(tag)
-
-            if not tags:
-                raw_concerns = policy.analysis.get("democratic_it_concerns")
-                if isinstance(raw_concerns, list):
-                    for item in raw_concerns:
-                        if isinstance(item, str):
-                            tags.append(item)
-                        elif isinstance(item, dict):
-                            topic = item.get("topic")
-                            if isinstance(topic, str):
-                                tags.append(topic)
-            return [t.strip() for t in tags if isinstance(t, str) and t.strip() and t.strip().lower() != "not_applicable"]
-
-        def merged_tags(result: ProposalWithLabel) -> List[str]:
-            tags: List[str] = []
-            if result.label and isinstance(result.label.it_topics, list):
-                tags.extend(result.label.it_topics)
-            tags.extend(extract_policy_tags(result))
-            seen = set()
-            out: List[str] = []
-            for tag in tags:
-                cleaned = tag.strip()
-                if not cleaned:
-                    continue
-                key = cleaned.lower()
-                if key in seen:
-                    continue
-                seen.add(key)
-                out.append(cleaned)
-            return out
-
-        def matches_topic(result: ProposalWithLabel) -> bool:
-            if not query.topic:
-                return True
-            needle = query.topic.strip().lower()
-            if not needle:
-                return True
-            return any(tag.lower() == needle for tag in merged_tags(result))
-
-        def matches_flags(result: ProposalWithLabel) -> bool:
-            has_pdf_link = bool(result.mainPdfUrl or (result.pdfUrls or []))
-            pdf_text = result.pdfText
-            has_pdf_text = bool(pdf_text and pdf_text.extracted_text and not pdf_text.error)
-            has_policy = bool(result.policy and result.policy.analysis)
-
-            if query.has_pdf_link is not None and has_pdf_link != query.has_pdf_link:
-                return False
-            if query.has_pdf_text is not None and has_pdf_text != query.has_pdf_text:
-                return False
-            if query.has_policy_analysis is not None and has_policy != query.has_policy_analysis:
-                return False
-            return True
-
-        needs_topic_merge = bool(query.topic)
-        if not needs_admin_flags and not needs_topic_merge:
-            rows = fetch_proposals(
-                {
-                    "type": query.type,
-                    "it_relevant": query.it_relevant,
-                    "topic": query.topic,
-                    "q": query.q,
-                    "limit": query.limit,
-                    "offset": query.offset,
-                }
-            )
-            return [row_to_result(r) for r in rows]
-
-        # Server-side flag/topic filtering with stable paging:
-        # We scan the ordered proposals and apply the filters in Python so the `offset`
-        # is interpreted on the filtered result set.
-        batch_size = min(500, max(100, query.limit * 5))
-        scanned_offset = 0
-        skipped = 0
-        out: List[ProposalWithLabel] = []
-
-        while len(out) < query.limit:
-            batch = fetch_proposals(
-                {
-                    "type": query.type,
-                    "it_relevant": query.it_relevant,
-                    "topic": None if needs_topic_merge else query.topic,
-                    "q": query.q,
-                    "limit": batch_size,
-                    "offset": scanned_offset,
-                }
-            )
-            if not batch:
-                break
-
-            scanned_offset += len(batch)
-            for raw in batch:
-                result = row_to_result(raw)
-                if not matches_flags(result):
-                    continue
-                if not matches_topic(result):
-                    continue
-                if skipped < query.offset:
-                    skipped += 1
-                    continue
-                out.append(result)
-                if len(out) >= query.limit:
-                    break
-
-            # Safety valve: avoid scanning forever if something goes wrong.
-            if scanned_offset > 20000:
-                break
-
-        return out
+        # Flag and topic filters are applied by the database, so one request returns the page.
+        rows = await fetch_proposals_async(
+            {
+                "type": query.type,
+                "it_relevant": query.it_relevant,
+                "topic": query.topic,
+                "q": query.q,
+                "has_pdf_link": query.has_pdf_link,
+                "has_pdf_text": query.has_pdf_text,
+                "has_policy_analysis": query.has_policy_analysis,
+                "limit": query.limit,
+                "offset": query.offset,
+                "after": after,
+            }
+        )
+        headers = None
+        if len(rows) == query.limit:
+            headers = {"X-Next-Cursor": _encode_cursor(rows[-1])}
+        return _json_response(_PROPOSAL_LIST.dump_json([_expand_row(r) for r in rows]), headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch proposals: {e}")
 
@@ -268,25 +243,7 @@ def get_proposal(
     if not row:
         raise HTTPException(status_code=404, detail="Proposal not found")
 
-    label_data = row.pop("proposal_labels", None)
-    if isinstance(label_data, list):
-        label_data = label_data[0] if label_data else None
-    row["label"] = label_data
-    policy_data = row.pop("proposal_policy_analyses", None)
-    if isinstance(policy_data, list):
-        policy_data = policy_data[0] if policy_data else None
-    row["policy"] = policy_data
-    pdf_text_data = row.pop("proposal_pdf_texts", None)
-    if isinstance(pdf_text_data, list):
-        pdf_text_data = pdf_text_data[0] if pdf_text_data else None
-    row["pdfText"] = pdf_text_data
-    raw_json = row.get("raw_json") or {}
-    if isinstance(raw_json, dict):
-        main_pdf_url = raw_json.get("mainPdfUrl")
-        row["mainPdfUrl"] = main_pdf_url if isinstance(main_pdf_url, str) else None
-        pdf_urls = raw_json.get("pdfUrls")
-        row["pdfUrls"] = [u for u in pdf_urls if isinstance(u, str)] if isinstance(pdf_urls, list) else []
-    return ProposalWithLabel(**row)
+    return _json_response(_expand_row(row).model_dump_json())
 
 
 @app.post("/proposals/{proposal_id}/pdf-text")
@@ -296,79 +253,136 @@ async def upload_proposal_pdf_text(
     file: UploadFile = File(..., description="PDF file"),
     source_url: str = Form("", description="Original PDF URL (optional)"),
     run_policy_analysis: bool = Form(True, description="Run policy analysis after extracting text"),
+    force: bool = Form(False, description="Re-extract and re-analyze even if this exact PDF was already stored"),
 ):
     """
     Upload a PDF from the user's browser (to bypass Cloudflare/WAF blocks on the backend),
     extract text server-side, store it, and optionally run the policy-analysis prompt.
+
+    Re-uploading the PDF that is already stored (same SHA-256) returns the stored text and
+    analysis without re-running either, unless `force` is set.
     """
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only .pdf files are supported")
 
-    max_mb = int(os.getenv("PDF_UPLOAD_MAX_MB", "25") or "25")
-    max_bytes = max_mb * 1024 * 1024
-    content = await file.read()
-    if len(content) > max_bytes:
-        raise HTTPException(status_code=413, detail=f"PDF too large (max {max_mb}MB)")
+    # Read in chunks so an oversized upload is rejected before it is fully buffered, and hash
+    # as we go instead of making a second pass over the bytes.
+    hasher = hashlib.sha256()
+    buf = bytearray()
+    while chunk := await file.read(UPLOAD_READ_CHUNK_BYTES):
+        buf += chunk
+        if len(buf) > PDF_UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"PDF too large (max {PDF_UPLOAD_MAX_MB}MB)")
+        hasher.update(chunk)
+    content = bytes(buf)
+    del buf
+
+    sha = hasher.hexdigest()
+
+    # Text extraction (CPU), the Supabase writes and the LLM call all block; run them in the
+    # threadpool so other requests on this worker keep being served meanwhile.
+    return await run_in_threadpool(
+        _store_pdf_text_and_analyze, proposal_id, content, sha, source_url, run_policy_analysis, force
+    )
+
 
-    sha = hashlib.sha256(content).hexdigest()
+def _store_pdf_text_and_analyze(
+    proposal_id: int,
+    content: bytes,
+    sha: str,
+    source_url: str,
+    run_analysis: bool,
+    force: bool = False,
+) -> dict:
+    """Blocking part of `upload_proposal_pdf_text`: extract, store, and optionally analyze."""
+    run_analysis = run_analysis and ENRICH_POLICY_ANALYSIS_ENABLED
+    proposal = None
+    if not force:
+        # The same read serves the duplicate check and, on a miss, the analysis below, so the
+        # check costs no extra round-trip.
+        proposal = fetch_proposal_by_id(proposal_id, use_cache=False)
+        if not proposal:
+            raise HTTPException(status_code=404, detail="Proposal not found")
+        stored = _first(proposal.get("proposal_pdf_texts"))
+        if stored and stored.get("sha256") == sha and not stored.get("error") and stored.get("extracted_text"):
+            analysis_row = _first(proposal.get("proposal_policy_analyses"))
+            if analysis_row or not run_analysis:
+                return {"proposal_id": proposal_id, "pdfText": stored, "policy": analysis_row, "policyError": None}
+            # Same text, but it was never analyzed: skip extraction and only run the analysis.
+            return _analyze_stored_pdf_text(proposal, stored)
 
     try:
-        max_pages = int(os.getenv("ENRICH_PDF_MAX_PAGES", "25") or "25")
-        extracted = extract_text_from_pdf_bytes(content, max_pages=max_pages)
+        extracted = extract_text_from_pdf_bytes(
+            content, max_pages=ENRICH_PDF_MAX_PAGES, max_chars=PDF_TEXT_MAX_CHARS
+        )
         if not extracted.strip():
             raise ValueError("No extractable text found (scanned PDF?)")
     except Exception as e:
-        upsert_proposal_pdf_text(
+        upsert_proposal_pdf_text_and_policy(
             {
                 "proposal_id": proposal_id,
                 "source_url": source_url or None,
                 "sha256": sha,
                 "extracted_text": "",
-                "extracted_at": datetime.now(timezone.utc).isoformat(),
                 "error": str(e),
             }
         )
         raise HTTPException(status_code=422, detail=f"Failed to extract PDF text: {e}")
 
     # Store extracted text (truncate if desired)
-    max_chars = int(os.getenv("PDF_TEXT_MAX_CHARS", "200000") or "200000")
-    if len(extracted) > max_chars:
-        extracted = extracted[:max_chars] + "\n\n[... afkortet ...]"
-
-    pdf_row = upsert_proposal_pdf_text(
-        {
-            "proposal_id": proposal_id,
-            "source_url": source_url or None,
-            "sha256": sha,
-            "extracted_text": extracted,
-            "extracted_at": datetime.now(timezone.utc).isoformat(),
-            "error": None,
-        }
-    )
-
-    analysis_row = None
+    if len(extracted) > PDF_TEXT_MAX_CHARS:
+        extracted = extracted[:PDF_TEXT_MAX_CHARS] + "\n\n[... afkortet ...]"
+
+    pdf_row = {
+        "proposal_id": proposal_id,
+        "source_url": source_url or None,
+        "sha256": sha,
+        "extracted_text": extracted,
+        "error": None,
+    }
+
+    policy_row = None
     policy_error = None
-    if run_policy_analysis and os.getenv("ENRICH_POLICY_ANALYSIS", "").strip().lower() in {"1", "true", "yes", "y", "on"}:
-        proposal = fetch_proposal_by_id(proposal_id)
+    if run_analysis:
+        if proposal is None:
+            proposal = fetch_proposal_by_id(proposal_id, use_cache=False)
         if proposal:
-            # Attach extracted text so analysis can use it without fetching remote PDFs.
-            proposal["pdfText"] = pdf_row
-            analysis = analyze_proposal_policy(proposal)
-            if analysis is not None:
-                analysis_row = upsert_proposal_policy_analysis(
-                    {
-                        "proposal_id": proposal_id,
-                        "analysis": analysis,
-                        "model": policy_analysis_model_id(),
-                        "prompt_version": policy_analysis_prompt_version(),
-                    }
-                )
-            else:
-                policy_error = "Policy analysis failed (see backend logs for details)."
+            # The analysis reads the new text from memory, so text and analysis can be written
+            # together in one round-trip afterwards.
+            policy_row, policy_error = _run_policy_analysis(proposal, pdf_row)
         else:
             policy_error = "Proposal not found after upload; policy analysis not run."
 
-    return {"proposal_id": proposal_id, "pdfText": pdf_row, "policy": analysis_row, "policyError": policy_error}
+    stored = upsert_proposal_pdf_text_and_policy(pdf_row, policy_row)
+    return {
+        "proposal_id": proposal_id,
+        "pdfText": stored.get("pdfText"),
+        "policy": stored.get("policy"),
+        "policyError": policy_error,
+    }
+
+
+def _analyze_stored_pdf_text(proposal: dict, pdf_row: dict) -> dict:
+    """Run and store the policy analysis for `proposal` using its already-stored PDF text."""
+    policy_row, policy_error = _run_policy_analysis(proposal, pdf_row)
+    if policy_row is not None:
+        policy_row = upsert_proposal_policy_analysis(policy_row)
+    return {"proposal_id": proposal["id"], "pdfText": pdf_row, "policy": policy_row, "policyError": policy_error}
+
+
+def _run_policy_analysis(proposal: dict, pdf_row: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """Returns (proposal_policy_analyses row to store, None) or (None, error message)."""
+    # Attach extracted text so analysis can use it without fetching remote PDFs.
+    proposal["pdfText"] = pdf_row
+    analysis = analyze_proposal_policy(proposal)
+    if analysis is None:
+        return None, "Policy analysis failed (see backend logs for details)."
+    return {
+        "proposal_id": proposal["id"],
+        "analysis": analysis,
+        "model": policy_analysis_model_id(),
+        "prompt_version": policy_analysis_prompt_version(),
+    }, None
 
 
 @app.post("/proposals/{proposal_id}/policy-analysis")
@@ -376,14 +390,15 @@ def run_policy_analysis(proposal_id: int, _user=Depends(require_admin)):
     """
     Re-run policy analysis for a proposal using already-stored PDF text (if present).
     """
-    if os.getenv("ENRICH_POLICY_ANALYSIS", "").strip().lower() not in {"1", "true", "yes", "y", "on"}:
+    if not ENRICH_POLICY_ANALYSIS_ENABLED:
         raise HTTPException(status_code=400, detail="ENRICH_POLICY_ANALYSIS is not enabled")
 
-    proposal = fetch_proposal_by_id(proposal_id)
+    proposal = fetch_proposal_by_id(proposal_id, use_cache=False)
     if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
 
-    analysis = analyze_proposal_policy(proposal)
+    # An explicit re-run asks for a fresh answer, not the cached one.
+    analysis = analyze_proposal_policy(proposal, use_cache=False)
     if analysis is None:
         raise HTTPException(status_code=502, detail="Policy analysis failed (see backend logs)")
 
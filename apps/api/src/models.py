@@ -1,62 +1,106 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, TIMESTAMP, JSON, REAL, ForeignKey, Index, CheckConstraint
-from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB, TIMESTAMPTZ
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.sql import func
 import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Computed, Integer, String, Text, TIMESTAMP, REAL, ForeignKey, Index, CheckConstraint, text
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, JSONB
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.sql import func
+
+# Every timestamp column in the schema is TIMESTAMPTZ.
+TIMESTAMPTZ = TIMESTAMP(timezone=True)
+
+
+class Base(DeclarativeBase):
+    type_annotation_map = {
+        datetime: TIMESTAMPTZ,
+        Dict[str, Any]: JSONB,
+    }
 
-Base = declarative_base()
 
 class Proposal(Base):
     __tablename__ = "proposals"
 
-    id = Column(Integer, primary_key=True)
-    periodeid = Column(Integer, nullable=False)
-    nummerprefix = Column(String, nullable=False)
-    nummernumerisk = Column(String, nullable=False)
-    nummer = Column(String, nullable=False)
-    titel = Column(String, nullable=False)
-    resume = Column(Text)
-    opdateringsdato = Column(TIMESTAMPTZ, nullable=False)
-    raw_json = Column(JSONB, nullable=False)
-    created_at = Column(TIMESTAMPTZ, server_default=func.now())
-    updated_at = Column(TIMESTAMPTZ, server_default=func.now(), onupdate=func.now())
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)  # ODA Sag id
+    periodeid: Mapped[int]
+    nummerprefix: Mapped[str]
+    nummernumerisk: Mapped[str]
+    nummer: Mapped[str]
+    titel: Mapped[str]
+    resume: Mapped[Optional[str]] = mapped_column(Text)
+    opdateringsdato: Mapped[datetime] = mapped_column()
+    raw_json: Mapped[Dict[str, Any]]
+    created_at: Mapped[Optional[datetime]] = mapped_column(server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(server_default=func.now(), onupdate=func.now())
+    # List filter columns (migration 004); the last three are maintained by triggers.
+    has_pdf_link: Mapped[Optional[bool]] = mapped_column(Computed(
+        "COALESCE((jsonb_typeof(raw_json -> 'mainPdfUrl') = 'string' AND raw_json ->> 'mainPdfUrl' <> '') "
+        "OR CASE WHEN jsonb_typeof(raw_json -> 'pdfUrls') = 'array' "
+        "THEN jsonb_array_length(raw_json -> 'pdfUrls') > 0 ELSE FALSE END, FALSE)",
+        persisted=True,
+    ))
+    has_pdf_text: Mapped[bool] = mapped_column(server_default=text("false"))
+    has_policy_analysis: Mapped[bool] = mapped_column(server_default=text("false"))
+    merged_tags: Mapped[List[str]] = mapped_column(ARRAY(Text), server_default=text("'{}'"))
 
     __table_args__ = (
         CheckConstraint("nummerprefix IN ('L', 'B')", name="check_nummerprefix"),
         Index('idx_proposals_nummerprefix', 'nummerprefix'),
         Index('idx_proposals_opdateringsdato', 'opdateringsdato'),
         Index('idx_proposals_created_at', 'created_at'),
+        Index('idx_proposals_opdateringsdato_id', opdateringsdato.desc(), id.desc()),
+        Index('idx_proposals_merged_tags', 'merged_tags', postgresql_using='gin'),
+        Index('idx_proposals_has_pdf_link', opdateringsdato.desc(), id.desc(), postgresql_where=text('has_pdf_link')),
+        Index('idx_proposals_has_pdf_text', opdateringsdato.desc(), id.desc(), postgresql_where=text('has_pdf_text')),
+        Index('idx_proposals_has_policy_analysis', opdateringsdato.desc(), id.desc(), postgresql_where=text('has_policy_analysis')),
+        # Free-text search (migration 011, needs pg_trgm).
+        Index('idx_proposals_titel_trgm', 'titel', postgresql_using='gin', postgresql_ops={'titel': 'gin_trgm_ops'}),
+        Index('idx_proposals_resume_trgm', 'resume', postgresql_using='gin', postgresql_ops={'resume': 'gin_trgm_ops'}),
+        Index('idx_proposals_nummer_trgm', 'nummer', postgresql_using='gin', postgresql_ops={'nummer': 'gin_trgm_ops'}),
     )
 
 class ProposalLabel(Base):
     __tablename__ = "proposal_labels"
 
-    proposal_id = Column(Integer, ForeignKey('proposals.id', ondelete='CASCADE'), primary_key=True)
-    it_relevant = Column(Boolean, nullable=False)
-    it_topics = Column(ARRAY(String), default=[])
-    it_summary_da = Column(Text)
-    why_it_relevant_da = Column(Text)
-    confidence = Column(REAL)
-    model = Column(String)
-    prompt_version = Column(String)
-    created_at = Column(TIMESTAMPTZ, server_default=func.now())
+    proposal_id: Mapped[int] = mapped_column(ForeignKey('proposals.id', ondelete='CASCADE'), primary_key=True)
+    it_relevant: Mapped[bool]
+    it_topics: Mapped[Optional[List[str]]] = mapped_column(ARRAY(String), default=list)
+    it_summary_da: Mapped[Optional[str]] = mapped_column(Text)
+    why_it_relevant_da: Mapped[Optional[str]] = mapped_column(Text)
+    confidence: Mapped[Optional[float]] = mapped_column(REAL)
+    model: Mapped[Optional[str]]
+    prompt_version: Mapped[Optional[str]]
+    created_at: Mapped[Optional[datetime]] = mapped_column(server_default=func.now())
 
     __table_args__ = (
         CheckConstraint("confidence >= 0 AND confidence <= 1", name="check_confidence"),
+        Index('idx_proposal_labels_it_relevant', 'it_relevant'),
     )
 
+class ProposalPdfText(Base):
+    __tablename__ = "proposal_pdf_texts"
+
+    proposal_id: Mapped[int] = mapped_column(ForeignKey('proposals.id', ondelete='CASCADE'), primary_key=True)
+    source_url: Mapped[Optional[str]] = mapped_column(Text)
+    sha256: Mapped[Optional[str]] = mapped_column(Text)
+    extracted_text: Mapped[str] = mapped_column(Text)
+    extracted_at: Mapped[Optional[datetime]] = mapped_column(server_default=func.now())
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[Optional[datetime]] = mapped_column(server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(server_default=func.now(), onupdate=func.now())
+
 class IngestionRun(Base):
     __tablename__ = "ingestion_runs"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    started_at = Column(TIMESTAMPTZ, server_default=func.now())
-    finished_at = Column(TIMESTAMPTZ)
-    last_watermark_before = Column(TIMESTAMPTZ)
-    last_watermark_after = Column(TIMESTAMPTZ)
-    fetched_count = Column(Integer, default=0)
-    updated_count = Column(Integer, default=0)
-    error = Column(Text)
-    created_at = Column(TIMESTAMPTZ, server_default=func.now())
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    started_at: Mapped[Optional[datetime]] = mapped_column(server_default=func.now())
+    finished_at: Mapped[Optional[datetime]]
+    last_watermark_before: Mapped[Optional[datetime]]
+    last_watermark_after: Mapped[Optional[datetime]]
+    fetched_count: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    updated_count: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[Optional[datetime]] = mapped_column(server_default=func.now())
 
     __table_args__ = (
         Index('idx_ingestion_runs_started_at', 'started_at'),
@@ -4,23 +4,58 @@ Helpers for working with Folketingets ODA API beyond the main /Sag feed.
 In particular, this module follows the Sag → SagDokument → Dokument → Fil chain
 to find direct file URLs (e.g. PDFs) for a given case (Sag).
 
-Note: querying /Fil?$filter=dokumentid eq ... does not work reliably, so we always
-resolve files via /Dokument?$expand=Fil.
+The whole chain is fetched in one paged request (/SagDokument?$expand=Dokument/Fil).
+Note: querying /Fil?$filter=dokumentid eq ... does not work reliably, so per-Dokument
+lookups (only used when the expand comes back incomplete) go through /Dokument?$expand=Fil.
+
+Every helper takes the caller's `httpx.Client`; pass one long-lived, pooled client (as
+IngestionService does) rather than a new one per call, so connections to ODA are reused.
 """
 
 from __future__ import annotations
 
+import os
 import random
+import threading
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 import httpx
 
+from .config import load_env
+
+load_env()
+
 ODA_BASE_URL = "https://oda.ft.dk/api"
 
 MAIN_DOKUMENT_TYPE_ID = 21
 MAIN_DOKUMENT_KATEGORI_ID = 31
 PAGE_SIZE = 100
+# Per-Dokument fallback lookups for one Sag run this many at a time.
+FALLBACK_CONCURRENCY = 8
+# Retries for transient ODA errors (429/5xx/timeouts), with "full jitter" backoff:
+# sleep uniform(0, min(cap, base * 2**attempt)), unless ODA sends Retry-After.
+DEFAULT_MAX_RETRIES = 2
+RETRY_BACKOFF_BASE_SECONDS = 0.5
+RETRY_BACKOFF_CAP_SECONDS = 30.0
+RETRY_AFTER_MAX_SECONDS = 60.0
+
+# Process-local LRU of per-Dokument lookups (Dokument+Fil, and /Fil fallback rows), keyed by
+# endpoint and dokumentid: the same Dokument shows up under several Sager and across backfill runs
+# in one process. Only non-empty results are kept. Entries expire after ODA_DOKUMENT_CACHE_TTL
+# seconds so a long-running API process picks up Dokumenter that ODA later changes (new Fil,
+# moved URL). ODA_DOKUMENT_CACHE_SIZE=0 or ODA_DOKUMENT_CACHE_TTL=0 disables it.
+DOKUMENT_CACHE_SIZE = int(os.getenv("ODA_DOKUMENT_CACHE_SIZE", "4096") or "4096")
+DOKUMENT_CACHE_TTL_SECONDS = float(os.getenv("ODA_DOKUMENT_CACHE_TTL", "3600") or "3600")
+_dokument_cache: "OrderedDict[Tuple[str, int], Tuple[float, Any]]" = OrderedDict()
+_dokument_cache_lock = threading.Lock()
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 def _is_pdf_format(value: Optional[str]) -> bool:
     if not value:
@@ -44,9 +79,20 @@ def _is_main_bill_dokument(dokument: Dict[str, Any]) -> bool:
     # Heuristic: the primary law-text document is typically identified by
     # Dokument.typeid == 21 and/or Dokument.kategoriid == 31.
     # This is more robust than title matching across varying wording.
-    typeid = _coerce_int(dokument.get("typeid")) or dokument.get("typeid")
-    kategoriid = _coerce_int(dokument.get("kategoriid")) or dokument.get("kategoriid")
-    return typeid == MAIN_DOKUMENT_TYPE_ID or kategoriid == MAIN_DOKUMENT_KATEGORI_ID
+    # ODA sends these as ints; only coerce when it doesn't.
+    typeid = dokument.get("typeid")
+    if typeid == MAIN_DOKUMENT_TYPE_ID:
+        return True
+    kategoriid = dokument.get("kategoriid")
+    if kategoriid == MAIN_DOKUMENT_KATEGORI_ID:
+        return True
+    if isinstance(typeid, str) and _coerce_int(typeid) == MAIN_DOKUMENT_TYPE_ID:
+        return True
+    return isinstance(kategoriid, str) and _coerce_int(kategoriid) == MAIN_DOKUMENT_KATEGORI_ID
+
+
+# Prefer API-backed download URLs (often not behind the same CDN/WAF rules as public `filurl`).
+_FILE_URL_KEYS = ("downloadurl", "url", "filurl", "link")
 
 
 def _extract_file_url(file_obj: Dict[str, Any]) -> Optional[str]:
@@ -54,50 +100,141 @@ def _extract_file_url(file_obj: Dict[str, Any]) -> Optional[str]:
     ODA's file URL field name can differ depending on endpoint/schema shape.
     Prefer common candidates, then fall back to any '*url*' string field.
     """
-    # Prefer API-backed download URLs (often not behind the same CDN/WAF rules as public `filurl`).
-    for key in ("downloadurl", "url", "filurl", "link"):
+    for key in _FILE_URL_KEYS:
         value = file_obj.get(key)
         if isinstance(value, str) and value.strip():
             return value.strip()
 
+    # Fallback scan: check the (cheap) value type before building the lowercased key.
     for key, value in file_obj.items():
-        if "url" in str(key).lower() and isinstance(value, str) and value.strip():
+        if isinstance(value, str) and key not in _FILE_URL_KEYS and "url" in str(key).lower() and value.strip():
             return value.strip()
 
     return None
 
 
+def _dokument_cache_get(key: Tuple[str, int]) -> Optional[Any]:
+    if DOKUMENT_CACHE_SIZE <= 0 or DOKUMENT_CACHE_TTL_SECONDS <= 0:
+        return None
+    with _dokument_cache_lock:
+        entry = _dokument_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _dokument_cache[key]
+            return None
+        _dokument_cache.move_to_end(key)
+        return entry[1]
+
+
+def _dokument_cache_put(key: Tuple[str, int], value: Any) -> None:
+    if DOKUMENT_CACHE_SIZE <= 0 or DOKUMENT_CACHE_TTL_SECONDS <= 0 or not value:
+        return
+    with _dokument_cache_lock:
+        _dokument_cache[key] = (time.monotonic() + DOKUMENT_CACHE_TTL_SECONDS, value)
+        _dokument_cache.move_to_end(key)
+        while len(_dokument_cache) > DOKUMENT_CACHE_SIZE:
+            _dokument_cache.popitem(last=False)
+
+
+def _is_transient_status(status_code: int) -> bool:
+    return status_code == 429 or 500 <= status_code <= 599
+
+
+def _retry_after_seconds(resp: Optional[httpx.Response]) -> Optional[float]:
+    if resp is None or not _is_transient_status(resp.status_code):
+        return None
+    raw = (resp.headers.get("retry-after") or "").strip()
+    if not raw:
+        return None
+    try:
+        seconds = float(raw)
+    except ValueError:
+        # HTTP-date form.
+        try:
+            seconds = (parsedate_to_datetime(raw) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX_SECONDS)
+
+
 def _get_json_with_retry(
     client: httpx.Client,
     url: str,
     params: Dict[str, Any],
     *,
-    max_retries: int = 2,
+    max_retries: int = DEFAULT_MAX_RETRIES,
 ) -> Dict[str, Any]:
     """
-    Basic retry logic for transient ODA errors (timeouts, 5xx, 429).
+    Basic retry logic for transient ODA errors (timeouts, 5xx, 429); other 4xx fail fast.
     We keep this conservative to avoid hammering the API.
     """
     attempt = 0
     while True:
+        resp = None
         try:
             resp = client.get(url, params=params)
-            if resp.status_code in (429,) or 500 <= resp.status_code <= 599:
+            if _is_transient_status(resp.status_code):
                 raise httpx.HTTPStatusError(
                     f"Transient ODA status {resp.status_code}", request=resp.request, response=resp
                 )
-            resp.raise_for_status()
-            data = resp.json()
-            if isinstance(data, dict):
-                return data
-            return {"value": data}
         except (httpx.TimeoutException, httpx.TransportError, httpx.HTTPStatusError) as e:
             if attempt >= max_retries:
                 raise e
-            # Exponential backoff with jitter.
-            sleep_s = (0.5 * (2**attempt)) + random.random() * 0.25
+            # Full-jitter exponential backoff (spreads concurrent workers out after a shared 429),
+            # unless ODA tells us how long to wait.
+            retry_after = _retry_after_seconds(resp)
+            if retry_after is not None:
+                sleep_s = retry_after
+            else:
+                sleep_s = random.uniform(
+                    0.0, min(RETRY_BACKOFF_CAP_SECONDS, RETRY_BACKOFF_BASE_SECONDS * (2**attempt))
+                )
             time.sleep(sleep_s)
             attempt += 1
+            continue
+
+        resp.raise_for_status()
+        data = resp.json()
+        if isinstance(data, dict):
+            return data
+        return {"value": data}
+
+
+def _map_concurrently(fn: Callable[[T], R], items: List[T]) -> List[R]:
+    """`[fn(x) for x in items]`, with independent (network-bound) calls run in parallel."""
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(FALLBACK_CONCURRENCY, len(items))) as executor:
+        return list(executor.map(fn, items))
+
+
+def _fetch_all_pages(
+    client: httpx.Client,
+    url: str,
+    params: Dict[str, Any],
+    *,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+) -> List[Dict[str, Any]]:
+    """
+    Collect every row of a paged ODA query (`$top`=PAGE_SIZE, `$skip` stepping).
+
+    A short page is the last one, so we stop there instead of requesting a trailing empty page.
+    """
+    params = {**params, "$top": PAGE_SIZE}
+    rows: List[Dict[str, Any]] = []
+    skip = 0
+    while True:
+        params["$skip"] = skip
+        payload = _get_json_with_retry(client, url, params, max_retries=max_retries)
+        page = payload.get("value", []) or []
+        if not isinstance(page, list) or not page:
+            break
+        rows.extend([r for r in page if isinstance(r, dict)])
+        if len(page) < PAGE_SIZE:
+            break
+        skip += PAGE_SIZE
+    return rows
 
 
 def _extract_pdf_urls_from_dokument(dokument: Dict[str, Any]) -> List[str]:
@@ -141,7 +278,7 @@ def fetch_sagdokument_rows_for_sag(
     client: httpx.Client,
     sag_id: int,
     *,
-    max_retries: int = 2,
+    max_retries: int = DEFAULT_MAX_RETRIES,
 ) -> List[Dict[str, Any]]:
     """
     Fetch SagDokument rows for a Sag.
@@ -151,25 +288,35 @@ def fetch_sagdokument_rows_for_sag(
     """
     url = f"{ODA_BASE_URL}/SagDokument"
     # Paginate defensively: some Sager have many documents and ODA may return a default page size.
-    params = {"$filter": f"sagid eq {sag_id}", "$format": "json", "$top": PAGE_SIZE}
-    rows: List[Dict[str, Any]] = []
-    skip = 0
-    while True:
-        params["$skip"] = skip
-        payload = _get_json_with_retry(client, url, params, max_retries=max_retries)
-        page = payload.get("value", []) or []
-        if not isinstance(page, list) or not page:
-            break
-        rows.extend([r for r in page if isinstance(r, dict)])
-        skip += PAGE_SIZE
-    return rows
+    params = {"$filter": f"sagid eq {sag_id}", "$format": "json"}
+    return _fetch_all_pages(client, url, params, max_retries=max_retries)
+
+
+def fetch_sagdokument_tree_for_sag(
+    client: httpx.Client,
+    sag_id: int,
+    *,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch SagDokument rows for a Sag with each row's Dokument and its Fil rows expanded
+    (`row["Dokument"]["Fil"]`), so the whole tree comes back in one request per page instead
+    of one /Dokument request per document.
+    """
+    url = f"{ODA_BASE_URL}/SagDokument"
+    params = {
+        "$filter": f"sagid eq {sag_id}",
+        "$expand": "Dokument/Fil",
+        "$format": "json",
+    }
+    return _fetch_all_pages(client, url, params, max_retries=max_retries)
 
 
 def fetch_dokument_with_fil(
     client: httpx.Client,
     dokument_id: int,
     *,
-    max_retries: int = 2,
+    max_retries: int = DEFAULT_MAX_RETRIES,
 ) -> Optional[Dict[str, Any]]:
     """
     Fetch a single Dokument (by id) expanded with Fil.
@@ -177,6 +324,10 @@ def fetch_dokument_with_fil(
     Note: querying /Fil?$filter=dokumentid eq ... does not work reliably, so we always
     go through this endpoint.
     """
+    cached = _dokument_cache_get(("Dokument", dokument_id))
+    if cached is not None:
+        return cached
+
     url = f"{ODA_BASE_URL}/Dokument"
     params = {"$filter": f"id eq {dokument_id}", "$expand": "Fil", "$format": "json"}
     payload = _get_json_with_retry(client, url, params, max_retries=max_retries)
@@ -184,14 +335,17 @@ def fetch_dokument_with_fil(
     if not isinstance(value, list) or not value:
         return None
     doc = value[0]
-    return doc if isinstance(doc, dict) else None
+    if not isinstance(doc, dict):
+        return None
+    _dokument_cache_put(("Dokument", dokument_id), doc)
+    return doc
 
 
 def fetch_fil_rows_for_dokument(
     client: httpx.Client,
     dokument_id: int,
     *,
-    max_retries: int = 2,
+    max_retries: int = DEFAULT_MAX_RETRIES,
 ) -> List[Dict[str, Any]]:
     """
     Fallback: fetch Fil rows directly for a Dokument.
@@ -199,27 +353,30 @@ def fetch_fil_rows_for_dokument(
     ODA's /Fil endpoint has historically been less reliable than using /Dokument?$expand=Fil,
     but this helps when the expand yields empty/missing Fil data.
     """
+    cached = _dokument_cache_get(("Fil", dokument_id))
+    if cached is not None:
+        return cached
+
     url = f"{ODA_BASE_URL}/Fil"
-    params = {"$filter": f"dokumentid eq {dokument_id}", "$format": "json", "$top": PAGE_SIZE}
-    rows: List[Dict[str, Any]] = []
-    skip = 0
-    while True:
-        params["$skip"] = skip
-        payload = _get_json_with_retry(client, url, params, max_retries=max_retries)
-        page = payload.get("value", []) or []
-        if not isinstance(page, list) or not page:
-            break
-        rows.extend([r for r in page if isinstance(r, dict)])
-        skip += PAGE_SIZE
+    params = {"$filter": f"dokumentid eq {dokument_id}", "$format": "json"}
+    rows = _fetch_all_pages(client, url, params, max_retries=max_retries)
+    _dokument_cache_put(("Fil", dokument_id), rows)
     return rows
 
 
+def _main_dokument_sort_key(row: Dict[str, Any], idx: int) -> Tuple[int, str, int]:
+    # Earliest released main document wins; undated rows sort last, then by position.
+    frigivelsesdato = row.get("frigivelsesdato")
+    frigivelsesdato_key = frigivelsesdato if isinstance(frigivelsesdato, str) else ""
+    return (0 if frigivelsesdato_key else 1, frigivelsesdato_key, idx)
+
+
 def fetch_pdf_urls_for_sag(
     client: httpx.Client,
     sag: Dict[str, Any],
     *,
     delay_ms: int = 0,
-    max_retries: int = 2,
+    max_retries: int = DEFAULT_MAX_RETRIES,
 ) -> Dict[str, Any]:
     """
     Fetch related documents for a Sag and extract relevant PDF URLs.
@@ -235,60 +392,132 @@ def fetch_pdf_urls_for_sag(
         # Small delay to avoid hammering ODA when iterating many Sager.
         time.sleep(delay_ms / 1000.0)
 
-    # New chain:
-    #   Sag -> SagDokument (gives dokumentid) -> Dokument (+Fil) -> Fil.filurl
+    # Chain:
+    #   Sag -> SagDokument -> Dokument (+Fil) -> Fil.filurl, expanded in one request.
     # We identify the main law-text document by (Dokument.typeid == 21 OR Dokument.kategoriid == 31).
-    sagdokument_rows = fetch_sagdokument_rows_for_sag(client, int(sag_id), max_retries=max_retries)
-
-    documents_debug: List[Dict[str, Any]] = []
-    best: Optional[Tuple[Tuple[int, str, int], Dict[str, Any], List[str]]] = None
+    sagdokument_rows = fetch_sagdokument_tree_for_sag(client, int(sag_id), max_retries=max_retries)
 
+    entries: List[Tuple[int, Dict[str, Any], int]] = []
     for idx, row in enumerate(sagdokument_rows):
         if not isinstance(row, dict):
             continue
-
-        dokument_id = _coerce_int(row.get("dokumentid"))
+        dokument_id = row.get("dokumentid")
+        if not isinstance(dokument_id, int):
+            dokument_id = _coerce_int(dokument_id)
         if dokument_id is None:
             continue
-
-        dokument = fetch_dokument_with_fil(client, dokument_id, max_retries=max_retries)
+        entries.append((idx, row, dokument_id))
+
+    # Best main document (lowest sort key) visible in the expanded data alone. Fallback lookups
+    # below are skipped for rows that could not beat it, so the common case (main document
+    # expanded with its PDF) needs no per-Dokument requests at all.
+    best_key: Optional[Tuple[int, str, int]] = None
+    for idx, row, _ in entries:
+        dokument = row.get("Dokument")
+        if isinstance(dokument, dict) and _is_main_bill_dokument(dokument) and _extract_pdf_urls_from_dokument(dokument):
+            key = _main_dokument_sort_key(row, idx)
+            if best_key is None or key < best_key:
+                best_key = key
+
+    def could_win(row: Dict[str, Any], idx: int) -> bool:
+        return best_key is None or _main_dokument_sort_key(row, idx) < best_key
+
+    # Rows whose expand is missing: resolve those Dokumenter on their own, in parallel.
+    missing_ids = [
+        dokument_id
+        for idx, row, dokument_id in entries
+        if not isinstance(row.get("Dokument"), dict) and could_win(row, idx)
+    ]
+    fetched = dict(
+        zip(
+            missing_ids,
+            _map_concurrently(
+                lambda dokument_id: fetch_dokument_with_fil(client, dokument_id, max_retries=max_retries),
+                missing_ids,
+            ),
+        )
+    )
+
+    resolved: List[Tuple[int, Dict[str, Any], int, Dict[str, Any], List[str]]] = []
+    # Debug entries by SagDokument position, so skipped rows still show up in `documents`.
+    debug_by_idx: Dict[int, Dict[str, Any]] = {}
+    for idx, row, dokument_id in entries:
+        dokument = row.get("Dokument")
+        if not isinstance(dokument, dict):
+            if dokument_id not in fetched:
+                # Not looked up because it couldn't beat the main document already found.
+                debug_by_idx[idx] = {
+                    "dokumentId": dokument_id,
+                    "typeid": None,
+                    "kategoriid": None,
+                    "titel": None,
+                    "sagDokumentFrigivelsesdato": row.get("frigivelsesdato"),
+                    "isMainCandidate": None,
+                    "pdfUrls": [],
+                    "lookupSkipped": True,
+                }
+                continue
+            dokument = fetched[dokument_id]
         if not dokument:
             continue
+        resolved.append((idx, row, dokument_id, dokument, _extract_pdf_urls_from_dokument(dokument)))
+
+    # Expand can sometimes be empty; as a last resort, try /Fil directly (again in parallel).
+    # Without any main candidate, every document's PDFs may be needed for the "any PDF" fallback.
+    fil_fallback_ids = [
+        dokument_id
+        for idx, row, dokument_id, dokument, pdf_urls in resolved
+        if not pdf_urls
+        and not (dokument.get("Fil") or dokument.get("fil"))
+        and (best_key is None or (_is_main_bill_dokument(dokument) and could_win(row, idx)))
+    ]
+    fil_rows_by_id = dict(
+        zip(
+            fil_fallback_ids,
+            _map_concurrently(
+                lambda dokument_id: fetch_fil_rows_for_dokument(client, dokument_id, max_retries=max_retries),
+                fil_fallback_ids,
+            ),
+        )
+    )
+
+    fil_fallback_set = set(fil_fallback_ids)
+    best: Optional[Tuple[Tuple[int, str, int], Dict[str, Any], List[str]]] = None
 
+    for idx, row, dokument_id, dokument, pdf_urls in resolved:
         is_main_candidate = _is_main_bill_dokument(dokument)
 
-        pdf_urls = _extract_pdf_urls_from_dokument(dokument)
-        if not pdf_urls:
-            # Expand can sometimes be empty; as a last resort, try /Fil directly.
-            fil_rows = fetch_fil_rows_for_dokument(client, dokument_id, max_retries=max_retries)
-            if fil_rows:
-                dokument_with_fallback = dict(dokument)
-                dokument_with_fallback["Fil"] = fil_rows
-                pdf_urls = _extract_pdf_urls_from_dokument(dokument_with_fallback)
+        fil_rows = fil_rows_by_id.get(dokument_id)
+        if not pdf_urls and fil_rows:
+            dokument_with_fallback = dict(dokument)
+            dokument_with_fallback["Fil"] = fil_rows
+            pdf_urls = _extract_pdf_urls_from_dokument(dokument_with_fallback)
 
         # Keep lightweight debug info (useful when a known PDF exists but isn't discovered).
-        documents_debug.append(
-            {
-                "dokumentId": dokument.get("id") or dokument_id,
-                "typeid": dokument.get("typeid"),
-                "kategoriid": dokument.get("kategoriid"),
-                "titel": dokument.get("titel"),
-                "sagDokumentFrigivelsesdato": row.get("frigivelsesdato"),
-                "isMainCandidate": is_main_candidate,
-                "pdfUrls": pdf_urls,
-            }
-        )
+        debug_entry = {
+            "dokumentId": dokument.get("id") or dokument_id,
+            "typeid": dokument.get("typeid"),
+            "kategoriid": dokument.get("kategoriid"),
+            "titel": dokument.get("titel"),
+            "sagDokumentFrigivelsesdato": row.get("frigivelsesdato"),
+            "isMainCandidate": is_main_candidate,
+            "pdfUrls": pdf_urls,
+        }
+        if not pdf_urls and not (dokument.get("Fil") or dokument.get("fil")) and dokument_id not in fil_fallback_set:
+            # Its /Fil fallback was skipped, so pdfUrls may be incomplete.
+            debug_entry["lookupSkipped"] = True
+        debug_by_idx[idx] = debug_entry
 
         if not is_main_candidate or not pdf_urls:
             continue
 
-        frigivelsesdato = row.get("frigivelsesdato")
-        frigivelsesdato_key = frigivelsesdato if isinstance(frigivelsesdato, str) else ""
-        sort_key = (0 if frigivelsesdato_key else 1, frigivelsesdato_key, idx)
+        sort_key = _main_dokument_sort_key(row, idx)
 
         if best is None or sort_key < best[0]:
             best = (sort_key, dokument, pdf_urls)
 
+    documents_debug = [debug_by_idx[idx] for idx in sorted(debug_by_idx)]
+
     main_pdf_url: Optional[str] = None
     urls: List[str] = []
     if best is not None:
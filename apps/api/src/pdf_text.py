@@ -1,18 +1,87 @@
 from __future__ import annotations
 
+import atexit
+import hashlib
 import io
 import os
-from typing import Optional
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from functools import lru_cache
+from itertools import islice
+from typing import IO, Iterator, NamedTuple, Optional, Tuple
 
 import httpx
 
+from .config import load_env
+
+load_env()
+
+
+# Shared across downloads so repeated fetches from the same hosts (ft.dk) reuse kept-alive
+# connections and TLS sessions instead of a new handshake per PDF.
+_PDF_CLIENT = httpx.Client(
+    follow_redirects=True,
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+)
+atexit.register(_PDF_CLIENT.close)
+
+# Downloaded PDFs are streamed into a temp file that stays in memory up to this size and spills
+# to disk beyond it, so a large PDF isn't held as one bytes object while pypdf parses it.
+PDF_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class _DownloadedPdf(NamedTuple):
+    file: IO[bytes]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    sha256: str
+
+
+class _CachedPdfText(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    sha256: str
+    text: str
+
+
+# Extracted text per (url, max_pages, max_chars), revalidated with a conditional GET
+# (ETag / Last-Modified) so unchanged PDFs are neither re-downloaded nor re-extracted; when the
+# server sends no validators, an unchanged SHA-256 of the bytes still skips the extraction.
+# PDF_TEXT_CACHE_SIZE=0 disables it.
+PDF_TEXT_CACHE_SIZE = int(os.getenv("PDF_TEXT_CACHE_SIZE", "256") or "256")
+_text_cache: "OrderedDict[Tuple[str, Optional[int], Optional[int]], _CachedPdfText]" = OrderedDict()
+_text_cache_lock = threading.Lock()
+
+
+def _text_cache_get(key: Tuple[str, Optional[int], Optional[int]]) -> Optional[_CachedPdfText]:
+    if PDF_TEXT_CACHE_SIZE <= 0:
+        return None
+    with _text_cache_lock:
+        entry = _text_cache.get(key)
+        if entry is not None:
+            _text_cache.move_to_end(key)
+        return entry
+
+
+def _text_cache_put(key: Tuple[str, Optional[int], Optional[int]], entry: _CachedPdfText) -> None:
+    if PDF_TEXT_CACHE_SIZE <= 0:
+        return
+    with _text_cache_lock:
+        _text_cache[key] = entry
+        _text_cache.move_to_end(key)
+        while len(_text_cache) > PDF_TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+
 
 def _normalize_text(text: str) -> str:
-    # Keep it readable for LLM context.
-    text = text.replace("\x00", "")
-    lines = [line.strip() for line in text.splitlines()]
-    lines = [line for line in lines if line]
-    return "\n".join(lines)
+    # Keep it readable for LLM context: strip every line and drop blank ones. map/filter keep the
+    # whole pass in C (a regex rewrite measured ~5x slower and differs on Unicode line breaks).
+    return "\n".join(filter(None, map(str.strip, text.replace("\x00", "").splitlines())))
 
 
 def _default_user_agent() -> str:
@@ -28,72 +97,194 @@ def _default_referer() -> str:
     return os.getenv("PDF_FETCH_REFERER") or "https://www.ft.dk/"
 
 
-def _download_pdf(url: str, *, timeout_seconds: float) -> bytes:
-    # Try a couple of header profiles to get past simple Cloudflare/WAF blocking.
-    header_profiles = [
-        {
-            "User-Agent": _default_user_agent(),
-            "Accept": "application/pdf,application/octet-stream;q=0.9,*/*;q=0.8",
-            "Accept-Language": "da,en-US;q=0.8,en;q=0.7",
-            "Referer": _default_referer(),
-        },
-        {
-            "User-Agent": _default_user_agent(),
-            "Accept": "*/*",
-            "Accept-Language": "da,en-US;q=0.8,en;q=0.7",
-        },
-    ]
+# Header profiles tried in order to get past simple Cloudflare/WAF blocking (built once; the env
+# overrides are read at import).
+_HEADER_PROFILES = (
+    {
+        "User-Agent": _default_user_agent(),
+        "Accept": "application/pdf,application/octet-stream;q=0.9,*/*;q=0.8",
+        "Accept-Language": "da,en-US;q=0.8,en;q=0.7",
+        "Referer": _default_referer(),
+    },
+    {
+        "User-Agent": _default_user_agent(),
+        "Accept": "*/*",
+        "Accept-Language": "da,en-US;q=0.8,en;q=0.7",
+    },
+)
 
+
+def _download_pdf(
+    url: str,
+    *,
+    timeout_seconds: float,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Optional[_DownloadedPdf]:
+    """
+    Download `url` into a spooled temp file (positioned at 0); the caller closes it.
+
+    With `etag` / `last_modified` from an earlier download the request is conditional, and None
+    means the server answered 304 Not Modified.
+    """
+    conditional = {}
+    if etag:
+        conditional["If-None-Match"] = etag
+    if last_modified:
+        conditional["If-Modified-Since"] = last_modified
+
+    # Only a WAF-style block (403, or an HTML page instead of the PDF) is worth retrying with the
+    # next profile; 404s, other HTTP errors and timeouts would fail the same way again.
     last_exc: Optional[Exception] = None
-    for headers in header_profiles:
-        try:
-            with httpx.Client(
-                timeout=timeout_seconds,
-                follow_redirects=True,
-                headers=headers,
-            ) as client:
-                resp = client.get(url)
-                if resp.status_code == 403:
-                    raise httpx.HTTPStatusError("403 Forbidden", request=resp.request, response=resp)
-                resp.raise_for_status()
-                content_type = (resp.headers.get("content-type") or "").lower()
-                if "text/html" in content_type:
-                    # Often a WAF/Cloudflare block page. Treat as failure so we can retry.
-                    raise ValueError(f"Expected PDF bytes, got content-type={content_type}")
-                return resp.content
-        except Exception as e:
-            last_exc = e
-            continue
+    for headers in _HEADER_PROFILES:
+        with _PDF_CLIENT.stream("GET", url, headers={**headers, **conditional}, timeout=timeout_seconds) as resp:
+            if resp.status_code == 304 and conditional:
+                return None
+            if resp.status_code == 403:
+                last_exc = httpx.HTTPStatusError("403 Forbidden", request=resp.request, response=resp)
+                continue
+            resp.raise_for_status()
+            content_type = (resp.headers.get("content-type") or "").lower()
+            if "text/html" in content_type:
+                # Often a WAF/Cloudflare block page.
+                last_exc = ValueError(f"Expected PDF bytes, got content-type={content_type}")
+                continue
+            spool = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
+            hasher = hashlib.sha256()
+            try:
+                for chunk in resp.iter_bytes(DOWNLOAD_CHUNK_BYTES):
+                    spool.write(chunk)
+                    hasher.update(chunk)
+            except BaseException:
+                spool.close()
+                raise
+            spool.seek(0)
+            return _DownloadedPdf(
+                file=spool,
+                etag=resp.headers.get("etag"),
+                last_modified=resp.headers.get("last-modified"),
+                sha256=hasher.hexdigest(),
+            )
 
     if last_exc:
         raise last_exc
     raise RuntimeError("Failed to download PDF")
 
 
-def extract_text_from_pdf_bytes(pdf_bytes: bytes, *, max_pages: Optional[int] = None) -> str:
-    from pypdf import PdfReader
+def extract_text_from_pdf_bytes(
+    pdf_bytes: bytes,
+    *,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+) -> str:
+    """
+    Extract normalized text from a PDF.
 
-    reader = PdfReader(io.BytesIO(pdf_bytes))
-    pages = reader.pages
-    if max_pages is not None:
-        pages = pages[: max_pages]
+    With `max_chars`, page decoding stops as soon as the collected text exceeds the budget,
+    so callers that only want an excerpt don't pay for the whole document. The result can
+    overshoot `max_chars` by up to one page; callers slice/mark truncation themselves.
+    """
+    return _extract_text_from_pdf_stream(io.BytesIO(pdf_bytes), max_pages=max_pages, max_chars=max_chars)
 
-    chunks: list[str] = []
-    for page in pages:
+
+@lru_cache(maxsize=1)
+def _pymupdf():
+    """PyMuPDF (optional dependency) if installed, else None."""
+    try:
+        import pymupdf
+    except ImportError:
         try:
-            t = page.extract_text() or ""
+            import fitz as pymupdf  # PyMuPDF < 1.24
+        except ImportError:
+            return None
+    return pymupdf
+
+
+def _iter_page_texts_pymupdf(pymupdf, stream: IO[bytes]) -> Iterator[str]:
+    # MuPDF's extractor is C; several times faster than pypdf's pure-Python one. It only takes
+    # bytes or a file name, so PDFs over PDF_SPOOL_MAX_BYTES (already spilled to disk by
+    # `_download_pdf`) are copied to a named temp file in chunks instead of read into memory.
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(0)
+    if size <= PDF_SPOOL_MAX_BYTES:
+        yield from _iter_pymupdf_doc_texts(pymupdf.open(stream=stream.read(), filetype="pdf"))
+        return
+
+    # delete=False + unlink: the file must be reopenable by name while we hold it (Windows).
+    named = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with named:
+            shutil.copyfileobj(stream, named, DOWNLOAD_CHUNK_BYTES)
+        yield from _iter_pymupdf_doc_texts(pymupdf.open(filename=named.name, filetype="pdf"))
+    finally:
+        os.unlink(named.name)
+
+
+def _iter_pymupdf_doc_texts(doc) -> Iterator[str]:
+    with doc:
+        for page in doc:
+            try:
+                yield page.get_text("text") or ""
+            except Exception:
+                yield ""
+
+
+def _iter_page_texts_pypdf(stream: IO[bytes]) -> Iterator[str]:
+    from pypdf import PdfReader
+
+    # Pages are parsed lazily as they're visited.
+    for page in PdfReader(stream).pages:
+        try:
+            yield page.extract_text() or ""
         except Exception:
-            t = ""
-        if t:
-            chunks.append(t)
-    return _normalize_text("\n\n".join(chunks))
+            yield ""
+
+
+def _extract_text_from_pdf_stream(
+    stream: IO[bytes],
+    *,
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+) -> str:
+    pymupdf = _pymupdf()
+    page_texts = _iter_page_texts_pymupdf(pymupdf, stream) if pymupdf is not None else _iter_page_texts_pypdf(stream)
+
+    chunks: list[str] = []
+    total = 0
+    with closing(page_texts):
+        for t in islice(page_texts, max_pages):
+            # Normalizing per page is equivalent to normalizing the joined text (blank lines are dropped).
+            t = _normalize_text(t)
+            if t:
+                chunks.append(t)
+                total += len(t) + 1
+                if max_chars is not None and total > max_chars:
+                    break
+    return "\n".join(chunks)
 
 
 def extract_text_from_pdf_url(
     url: str,
     *,
     max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
     timeout_seconds: float = 30.0,
 ) -> str:
-    pdf_bytes = _download_pdf(url, timeout_seconds=timeout_seconds)
-    return extract_text_from_pdf_bytes(pdf_bytes, max_pages=max_pages)
+    key = (url, max_pages, max_chars)
+    cached = _text_cache_get(key)
+    downloaded = _download_pdf(
+        url,
+        timeout_seconds=timeout_seconds,
+        etag=cached.etag if cached else None,
+        last_modified=cached.last_modified if cached else None,
+    )
+    if downloaded is None:
+        return cached.text
+
+    with downloaded.file as pdf_file:
+        if cached is not None and cached.sha256 == downloaded.sha256:
+            text = cached.text
+        else:
+            text = _extract_text_from_pdf_stream(pdf_file, max_pages=max_pages, max_chars=max_chars)
+    _text_cache_put(key, _CachedPdfText(downloaded.etag, downloaded.last_modified, downloaded.sha256, text))
+    return text
@@ -1,16 +1,42 @@
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
-from .llm import chat_json_schema, get_llm_config
+from .llm import LLM_MAX_RETRIES, chat_json_schema, get_llm_config, is_transient_llm_error
 from .enrichment import _build_pdf_excerpt  # keep PDF extraction behavior consistent
+from .supabase_rest import fetch_policy_analysis_cache, upsert_policy_analysis_cache
 
-POLICY_ANALYSIS_PROMPT_VERSION = "3.1"
+logger = logging.getLogger(__name__)
 
+POLICY_ANALYSIS_PROMPT_VERSION = "3.2"
+
+# Law text beyond this many characters is cut before it goes into the prompt; stored/uploaded
+# PDF text can be far longer (PDF_TEXT_MAX_CHARS) than is useful or affordable per LLM call.
+POLICY_ANALYSIS_MAX_LAW_CHARS = int(os.getenv("POLICY_ANALYSIS_MAX_LAW_CHARS", "40000") or "40000")
+# Seconds an LLM response stays reusable for an identical prompt/model/settings (policy_analysis_cache
+# table); 0 disables the cache. With a non-zero POLICY_ANALYSIS_TEMPERATURE this also means an
+# unchanged proposal keeps the same (sampled) analysis for that long instead of a fresh sample;
+# the admin re-run endpoint always asks the model again.
+POLICY_ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("POLICY_ANALYSIS_CACHE_TTL", "604800") or "604800")
+POLICY_ANALYSIS_SCHEMA_NAME = "policy_analysis_v3"
+
+# Read once at import; analyze_proposal_policy runs per proposal in the enrichment loops.
+_ENABLED = os.getenv("ENRICH_POLICY_ANALYSIS", "").strip().lower() in {"1", "true", "yes", "y", "on"}
+_PROMPT_VERSION = os.getenv("POLICY_ANALYSIS_PROMPT_VERSION", POLICY_ANALYSIS_PROMPT_VERSION)
+_TEMPERATURE = float(os.getenv("POLICY_ANALYSIS_TEMPERATURE", "0.3") or "0.3")
+_MAX_TOKENS = int(os.getenv("POLICY_ANALYSIS_MAX_TOKENS", "1400") or "1400")
+
+
+# Static instructions + output format, sent as the system message. It contains no per-proposal
+# text, so every call shares a byte-identical prefix that providers' automatic prompt caching
+# (OpenAI, Groq) can reuse; the proposal itself goes last, in the user message.
+POLICY_ANALYSIS_SYSTEM_PROMPT = """
+Du svarer kun med valid JSON og følger det angivne outputformat.
 
-POLICY_ANALYSIS_PROMPT = """
 Du er en analytiker med fokus på demokratisk kontrol, digital suverænitet, borgerrettigheder og offentlig IT.
 
 Opgave:
@@ -34,57 +60,52 @@ VIGTIGT:
   3) Gavner det den lokale økonomi – eller store techkoncerner?
   4) Er der taget højde for sikkerhed, etik og borgernes ret til privatliv?
 
-INPUT:
-Titel: {title}
-Resumé: {resume}
-Lovtekst (PDF-uddrag, kan være afkortet): {law_text}
-
 OUTPUT (præcis dette JSON-format):
 
-{{
-  "meta": {{
+{
+  "meta": {
     "title": "",
     "jurisdiction": "",
     "law_type": "law|bill|regulation|directive|unknown",
     "analysis_timestamp_iso": ""
-  }},
+  },
 
-  "summary": {{
+  "summary": {
     "one_paragraph": "",
     "what_changes_in_practice": ""
-  }},
+  },
 
   "it_hooks": [
-    {{
+    {
       "hook": "",
       "why_it_implies_it_systems_or_data": "",
       "likely_data_types": ["", ""],
       "who_might_run_it": "uklart; bør afklares",
       "privacy_or_security_surface": ""
-    }}
+    }
   ],
 
   "democratic_change_requests": [
-    {{
+    {
       "request": "",
       "rationale": "",
       "targets_hook_index": 0,
       "implementation_hint": ""
-    }}
+    }
   ],
 
   "questions_to_ask": [
-    {{
+    {
       "question": "",
       "why_it_matters": ""
-    }}
+    }
   ],
 
   "amendment_text_suggestions": [
-    {{
+    {
       "short_clause": "",
       "where_to_insert": ""
-    }}
+    }
   ],
 
   "top_risks_if_unchanged": [
@@ -94,7 +115,13 @@ OUTPUT (præcis dette JSON-format):
   "positive_elements_to_keep": [
     ""
   ]
-}}
+}
+""".strip()
+
+POLICY_ANALYSIS_INPUT_TEMPLATE = """INPUT:
+Titel: {title}
+Resumé: {resume}
+Lovtekst (PDF-uddrag, kan være afkortet): {law_text}
 """
 
 POLICY_ANALYSIS_SCHEMA: Dict[str, Any] = {
@@ -202,11 +229,43 @@ POLICY_ANALYSIS_SCHEMA: Dict[str, Any] = {
 }
 
 
+def _split_prompt_template(template: str, fields: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Render `template`'s escaped braces once and split it around `fields` (which must each appear
+    once, in that order), so per-call rendering is a join instead of a `str.format` pass.
+    """
+    rendered = template.format(**{name: f"\x00{name}\x00" for name in fields})
+    parts = []
+    for name in fields:
+        head, rendered = rendered.split(f"\x00{name}\x00", 1)
+        parts.append(head)
+    parts.append(rendered)
+    return tuple(parts)
+
+
+_PROMPT_PARTS = _split_prompt_template(POLICY_ANALYSIS_INPUT_TEMPLATE, ("title", "resume", "law_text"))
+
+
+def _truncate_law_text(text: str, max_chars: int) -> str:
+    """
+    Cut `text` to about `max_chars`, keeping the head (the bill's provisions) and the tail (the
+    remarks on the individual provisions, commencement) and marking the gap. Deterministic, so
+    the same PDF text always yields the same prompt (and policy_analysis_cache key).
+    """
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    head = max_chars * 3 // 5
+    tail = max_chars - head
+    return f"{text[:head]}\n\n[... afkortet ...]\n\n{text[-tail:]}"
+
+
+def _render_policy_prompt(title: str, resume: str, law_text: str) -> str:
+    p0, p1, p2, p3 = _PROMPT_PARTS
+    return "".join((p0, title, p1, resume, p2, law_text, p3))
+
+
 def policy_analysis_enabled() -> bool:
-    raw = os.getenv("ENRICH_POLICY_ANALYSIS", "").strip().lower()
-    if not raw:
-        return False
-    return raw in {"1", "true", "yes", "y", "on"}
+    return _ENABLED
 
 
 def policy_analysis_model_id() -> Optional[str]:
@@ -217,70 +276,124 @@ def policy_analysis_model_id() -> Optional[str]:
 
 
 def policy_analysis_prompt_version() -> str:
-    return os.getenv("POLICY_ANALYSIS_PROMPT_VERSION", POLICY_ANALYSIS_PROMPT_VERSION)
+    return _PROMPT_VERSION
+
+
+def _policy_cache_key(prompt: str, model_id: Optional[str]) -> str:
+    material = "|".join(
+        (
+            _PROMPT_VERSION,
+            model_id or "",
+            repr(_TEMPERATURE),
+            str(_MAX_TOKENS),
+            POLICY_ANALYSIS_SCHEMA_NAME,
+            POLICY_ANALYSIS_SYSTEM_PROMPT,
+            prompt,
+        )
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
 
 
-def analyze_proposal_policy(proposal_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+def _stored_law_text(proposal_data: Dict[str, Any]) -> str:
+    """
+    Already-extracted PDF text for the proposal (uploaded via browser or stored earlier), so
+    analysis doesn't refetch the PDF (and hit Cloudflare/WAF issues); "" if there is none.
+    """
+    candidates = [proposal_data.get("pdfText")]
+    # The proposal_pdf_texts embed is an object or a one-element list depending on the PostgREST version.
+    embedded = proposal_data.get("proposal_pdf_texts")
+    candidates.extend(embedded[:1] if isinstance(embedded, list) else [embedded])
+    for candidate in candidates:
+        if isinstance(candidate, dict):
+            extracted = candidate.get("extracted_text")
+            if isinstance(extracted, str) and extracted.strip():
+                return extracted.strip()
+    return ""
+
+
+def _finalize_meta(result: Dict[str, Any], title: str, *, fresh: bool) -> None:
+    meta = result.get("meta")
+    if not isinstance(meta, dict):
+        meta = {}
+        result["meta"] = meta
+    if not isinstance(meta.get("title"), str) or not meta.get("title"):
+        meta["title"] = title
+    # The model can't know the current time, so a fresh answer is always stamped here; a cached
+    # one keeps the time it was actually produced.
+    timestamp = meta.get("analysis_timestamp_iso")
+    if fresh or not (isinstance(timestamp, str) and timestamp):
+        meta["analysis_timestamp_iso"] = datetime.now(timezone.utc).isoformat()
+
+
+def analyze_proposal_policy(proposal_data: Dict[str, Any], *, use_cache: bool = True) -> Optional[Dict[str, Any]]:
     """
     Returns:
-        Parsed JSON object matching POLICY_ANALYSIS_PROMPT's schema, or None on failure.
+        Parsed JSON object matching POLICY_ANALYSIS_SCHEMA, or None on failure.
+
+    An identical earlier request (same prompt, model and settings) within POLICY_ANALYSIS_CACHE_TTL
+    is answered from policy_analysis_cache; `use_cache=False` forces a fresh LLM call (the result
+    still refreshes the cache).
     """
     title = (proposal_data.get("titel") or "").strip()
     resume = (proposal_data.get("resume") or "").strip() or "Ingen resumé tilgængelig"
 
-    # Prefer already-extracted text (uploaded via browser) to avoid Cloudflare/WAF fetch issues.
-    law_text = ""
-    pdf_text_obj = proposal_data.get("pdfText")
-    if isinstance(pdf_text_obj, dict):
-        extracted = pdf_text_obj.get("extracted_text")
-        if isinstance(extracted, str):
-            law_text = extracted.strip()
-
-    if not law_text:
-        embedded = proposal_data.get("proposal_pdf_texts")
-        if isinstance(embedded, list) and embedded:
-            first = embedded[0]
-            if isinstance(first, dict):
-                extracted = first.get("extracted_text")
-                if isinstance(extracted, str):
-                    law_text = extracted.strip()
+    law_text = _stored_law_text(proposal_data)
 
     # Final fallback: attempt remote PDF fetch (may fail) then fall back to resume.
     if not law_text:
         law_text = _build_pdf_excerpt(proposal_data).strip()
     if not law_text:
         law_text = resume
+    law_text = _truncate_law_text(law_text, POLICY_ANALYSIS_MAX_LAW_CHARS)
 
-    prompt = POLICY_ANALYSIS_PROMPT.format(
-        title=title,
-        resume=resume,
-        law_text=law_text or "Ingen lovtekst tilgængelig",
-    )
+    prompt = _render_policy_prompt(title, resume, law_text or "Ingen lovtekst tilgængelig")
+
+    cache_key = None
+    result = None
+    if POLICY_ANALYSIS_CACHE_TTL_SECONDS > 0:
+        cache_key = _policy_cache_key(prompt, policy_analysis_model_id())
+        if use_cache:
+            try:
+                result = fetch_policy_analysis_cache(cache_key, POLICY_ANALYSIS_CACHE_TTL_SECONDS)
+            except Exception as e:
+                logger.warning("Policy analysis cache lookup failed: %s", e)
+
+    if isinstance(result, dict):
+        _finalize_meta(result, title, fresh=False)
+        return result
 
     try:
         result = chat_json_schema(
             [
-                {
-                    "role": "system",
-                    "content": "Du svarer kun med valid JSON og følger det angivne outputformat.",
-                },
+                {"role": "system", "content": POLICY_ANALYSIS_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
             schema=POLICY_ANALYSIS_SCHEMA,
-            schema_name="policy_analysis_v3",
-            temperature=float(os.getenv("POLICY_ANALYSIS_TEMPERATURE", "0.3") or "0.3"),
-            max_tokens=int(os.getenv("POLICY_ANALYSIS_MAX_TOKENS", "1400") or "1400"),
+            schema_name=POLICY_ANALYSIS_SCHEMA_NAME,
+            temperature=_TEMPERATURE,
+            max_tokens=_MAX_TOKENS,
         )
     except Exception as e:
-        print(f"Policy analysis failed: {e}")
+        if is_transient_llm_error(e):
+            # Already retried by the client; a later re-run may well succeed.
+            logger.warning("Policy analysis failed after %d retries (transient): %s", LLM_MAX_RETRIES, e)
+        else:
+            logger.exception("Policy analysis failed: %s", e)
         return None
 
-    meta = result.get("meta")
-    if not isinstance(meta, dict):
-        meta = {}
-        result["meta"] = meta
-    if not isinstance(meta.get("title"), str) or not meta.get("title"):
-        meta["title"] = title
-    meta["analysis_timestamp_iso"] = datetime.now(timezone.utc).isoformat()
+    _finalize_meta(result, title, fresh=True)
+
+    if cache_key is not None:
+        try:
+            upsert_policy_analysis_cache(
+                {
+                    "key": cache_key,
+                    "analysis": result,
+                    "model": policy_analysis_model_id(),
+                    "prompt_version": _PROMPT_VERSION,
+                }
+            )
+        except Exception as e:
+            logger.warning("Policy analysis cache write failed: %s", e)
 
     return result
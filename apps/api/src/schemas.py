@@ -95,7 +95,10 @@ class ProposalsQuery(BaseModel):
     has_pdf_text: Optional[bool] = None
     has_policy_analysis: Optional[bool] = None
     limit: int = Field(default=50, ge=1, le=1000)
-    offset: int = Field(default=0, ge=0)
+    # Kept for small jumps / back-compat; deep paging goes through `cursor`.
+    offset: int = Field(default=0, ge=0, le=1000)
+    # Opaque keyset cursor from a previous page's `X-Next-Cursor` header.
+    cursor: Optional[str] = None
 
 class IngestResponse(BaseModel):
     run_id: UUID
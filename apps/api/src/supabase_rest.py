@@ -1,7 +1,13 @@
 import os
-from typing import Any, Dict, List, Optional
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
 from .config import load_env
 
 load_env()
@@ -26,28 +32,195 @@ _headers = {
     "Content-Type": "application/json",
 }
 
-_client = httpx.Client(timeout=30.0, headers=_headers)
+# Fail fast on an unreachable host instead of waiting out the full read timeout.
+_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+# Retries here only cover failed connection attempts (nothing was sent), so they're safe for writes.
+_CONNECT_RETRIES = 2
+
+# Shared by ingestion/backfill writes, which run from thread pools: HTTP/2 multiplexes them over a
+# few kept-alive connections instead of a TLS handshake per worker.
+_client = httpx.Client(
+    timeout=_TIMEOUT,
+    headers=_headers,
+    transport=httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100, keepalive_expiry=60.0),
+        retries=_CONNECT_RETRIES,
+    ),
+)
+
+# Short-lived read cache for the API's proposal reads (detail by id, and list queries).
+# Entries are stored serialized so callers can mutate what they get back. Any write made through
+# this module clears the cache; writes from other processes show up once the TTL expires.
+PROPOSAL_CACHE_TTL_SECONDS = float(os.getenv("PROPOSAL_CACHE_TTL", "30") or "30")
+PROPOSAL_LIST_CACHE_TTL_SECONDS = float(os.getenv("PROPOSAL_LIST_CACHE_TTL", "15") or "15")
+READ_CACHE_MAX_SIZE = 1024
+
+_read_cache: "OrderedDict[Tuple[Any, ...], Tuple[float, bytes]]" = OrderedDict()
+_read_cache_lock = threading.Lock()
+_read_cache_stats = {"hits": 0, "misses": 0}
+# Bumped on every invalidation. A read only stores its result if no write started or finished
+# while it was in flight, so a slow read can't re-cache a row the write just replaced.
+_read_cache_generation = 0
+
+
+def _read_cache_get(key: Tuple[Any, ...]) -> Optional[Any]:
+    with _read_cache_lock:
+        entry = _read_cache.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del _read_cache[key]
+            _read_cache_stats["misses"] += 1
+            return None
+        _read_cache.move_to_end(key)
+        _read_cache_stats["hits"] += 1
+        payload = entry[1]
+    return orjson.loads(payload)
+
+
+def _read_cache_put(key: Tuple[Any, ...], value: Any, ttl: float, generation: int) -> None:
+    if ttl <= 0:
+        return
+    payload = orjson.dumps(value)
+    with _read_cache_lock:
+        if generation != _read_cache_generation:
+            return
+        _read_cache[key] = (time.monotonic() + ttl, payload)
+        _read_cache.move_to_end(key)
+        while len(_read_cache) > READ_CACHE_MAX_SIZE:
+            _read_cache.popitem(last=False)
+
+
+def _invalidate_read_cache() -> None:
+    global _read_cache_generation
+    with _read_cache_lock:
+        _read_cache_generation += 1
+        _read_cache.clear()
+
+
+def read_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters for the proposal read cache (for tuning the TTLs)."""
+    with _read_cache_lock:
+        return {**_read_cache_stats, "size": len(_read_cache)}
+
+
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """
+    Shared async client for request handlers, created on first use inside the running event loop.
+    HTTP/2 lets concurrent list reads share one connection to Supabase.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            timeout=_TIMEOUT,
+            headers=_headers,
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=60.0),
+                retries=_CONNECT_RETRIES,
+            ),
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
 
 
 def _request(method: str, path: str, params: Optional[Dict[str, Any]] = None, json: Any = None, headers: Optional[Dict[str, str]] = None):
     url = f"{BASE_URL}/{path}"
-    response = _client.request(method, url, params=params, json=json, headers=headers)
+    # orjson is much faster than httpx's stdlib `json=` encoding for the large raw_json payloads.
+    content = orjson.dumps(json) if json is not None else None
+    if method != "GET":
+        # Clear before so reads stop serving the old row, and again once the write is done
+        # (even if it failed part-way) so nothing cached while it was in flight survives.
+        _invalidate_read_cache()
+        try:
+            response = _client.request(method, url, params=params, content=content, headers=headers)
+        finally:
+            _invalidate_read_cache()
+    else:
+        response = _client.request(method, url, params=params, content=content, headers=headers)
     if response.status_code >= 400:
         raise Exception(f"Supabase REST error {response.status_code}: {response.text}")
-    if response.text:
-        return response.json()
+    # Decode the raw bytes with orjson, as `_request_async` does; `response.json()` would first
+    # decode them to str and then parse with the stdlib.
+    if response.content:
+        return orjson.loads(response.content)
     return None
 
 
-def fetch_proposals(query: Dict[str, Any]) -> List[Dict[str, Any]]:
-    select_clause = "*,proposal_labels(*),proposal_policy_analyses(*),proposal_pdf_texts(*)"
+async def _request_async(method: str, path: str, params: Optional[Dict[str, Any]] = None, json: Any = None, headers: Optional[Dict[str, str]] = None):
+    url = f"{BASE_URL}/{path}"
+    content = orjson.dumps(json) if json is not None else None
+    if method != "GET":
+        _invalidate_read_cache()
+        try:
+            response = await _get_async_client().request(method, url, params=params, content=content, headers=headers)
+        finally:
+            _invalidate_read_cache()
+    else:
+        response = await _get_async_client().request(method, url, params=params, content=content, headers=headers)
+    if response.status_code >= 400:
+        raise Exception(f"Supabase REST error {response.status_code}: {response.text}")
+    if response.content:
+        return orjson.loads(response.content)
+    return None
+
+
+# List reads only project what ProposalWithLabel returns: the two PDF URL keys instead of the
+# whole raw_json, and a short excerpt instead of the full extracted PDF text
+# (see migrations/005_add_pdf_text_excerpt.sql).
+_LIST_PROPOSAL_COLUMNS = (
+    "id,periodeid,nummerprefix,nummernumerisk,nummer,titel,resume,opdateringsdato,"
+    "mainPdfUrl:raw_json->mainPdfUrl,pdfUrls:raw_json->pdfUrls"
+)
+_LIST_PDF_TEXT_COLUMNS = (
+    "proposal_id,source_url,sha256,extracted_at,error,created_at,updated_at,"
+    "extracted_text:extracted_text_excerpt"
+)
+
+
+# Characters that would break a PostgREST `or=(...)` expression, mapped to spaces in one pass.
+_SAFE_Q_TABLE = str.maketrans({",": " ", "(": " ", ")": " "})
+
+# A bill number such as "L 12" / "b12": searched on `nummer` alone (stored as "L 12").
+_NUMMER_QUERY_RE = re.compile(r"([LB])\s*(\d+)", re.IGNORECASE)
+
+
+def _list_select(labels_embed: str) -> str:
+    return (
+        f"{_LIST_PROPOSAL_COLUMNS},{labels_embed}(*),proposal_policy_analyses(*),"
+        f"proposal_pdf_texts({_LIST_PDF_TEXT_COLUMNS})"
+    )
+
+
+def _proposals_query_params(query: Dict[str, Any]) -> Dict[str, Any]:
     params: Dict[str, Any] = {
-        "select": select_clause,
-        "order": "opdateringsdato.desc",
+        "select": _list_select("proposal_labels"),
+        # `id` breaks ties so paging (offset or keyset) is stable.
+        "order": "opdateringsdato.desc,id.desc",
         "limit": query["limit"],
-        "offset": query["offset"],
     }
 
+    after = query.get("after")
+    if not after and query.get("offset"):
+        params["offset"] = query["offset"]
+    if after:
+        # Keyset paging: rows strictly after (opdateringsdato, id) in the sort order above, so
+        # deep pages are an index range scan instead of skipping `offset` rows.
+        after_ts, after_id = after
+        params["and"] = (
+            f'(or(opdateringsdato.lt."{after_ts}",'
+            f'and(opdateringsdato.eq."{after_ts}",id.lt.{int(after_id)})))'
+        )
+
     if query.get("type"):
         params["nummerprefix"] = f"eq.{query['type']}"
 
@@ -56,23 +229,36 @@ def fetch_proposals(query: Dict[str, Any]) -> List[Dict[str, Any]]:
 
     # If we're searching by exact ID, do not force an inner join on labels.
     # Otherwise, unlabeled proposals would never show up (even if the ID exists).
-    if (query.get("it_relevant") is not None or query.get("topic")) and not is_id_lookup:
-        params["select"] = "*,proposal_labels!inner(*),proposal_policy_analyses(*),proposal_pdf_texts(*)"
-
     if query.get("it_relevant") is not None and not is_id_lookup:
+        params["select"] = _list_select("proposal_labels!inner")
         params["proposal_labels.it_relevant"] = f"eq.{str(query['it_relevant']).lower()}"
 
-    if query.get("topic"):
-        topic = query["topic"].lower()
-        params["proposal_labels.it_topics"] = f"cs.{{{topic}}}"
+    # Flag and topic filters run against columns kept up to date in the database
+    # (see migrations/004_add_proposal_filter_columns.sql), so `limit`/`offset` apply to the
+    # filtered set and only the requested page is transferred.
+    for flag in ("has_pdf_link", "has_pdf_text", "has_policy_analysis"):
+        if query.get(flag) is not None:
+            params[flag] = f"eq.{str(query[flag]).lower()}"
 
+    topic = (query.get("topic") or "").strip().lower()
+    if topic:
+        # `merged_tags` holds lowercased label topics + policy tags; quote the array element.
+        quoted = topic.replace("\\", "\\\\").replace('"', '\\"')
+        params["merged_tags"] = f'cs.{{"{quoted}"}}'
+
+    nummer_match = _NUMMER_QUERY_RE.fullmatch(q)
     if is_id_lookup:
         params["id"] = f"eq.{int(q)}"
+    elif nummer_match:
+        # One indexed column instead of the three-way `or` below. The trailing wildcard keeps
+        # "L 12" finding "L 12 A" (and "L 120"), as the substring search did.
+        prefix, number = nummer_match.groups()
+        params["nummer"] = f"ilike.{prefix.upper()} {number}*"
     elif q:
         # PostgREST `or` syntax is comma-separated, so we sanitize a few characters that would
         # otherwise break the expression. This is not about SQL injection (PostgREST parses
         # the expression), but about keeping a valid filter string.
-        safe = q.replace(",", " ").replace("(", " ").replace(")", " ").strip()
+        safe = q.translate(_SAFE_Q_TABLE).strip()
         like = f"ilike.*{safe}*"
         # Keep search on the base `proposals` table columns. (PostgREST `or=(...)` is reliable
         # here; mixing embedded-table columns inside `or` can be inconsistent depending on
@@ -80,36 +266,78 @@ def fetch_proposals(query: Dict[str, Any]) -> List[Dict[str, Any]]:
         clauses: List[str] = [f"titel.{like}", f"nummer.{like}", f"resume.{like}"]
         params["or"] = f"({','.join(clauses)})"
 
-    return _request("GET", "proposals", params=params) or []
+    return params
+
+
+def fetch_proposals(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return _request("GET", "proposals", params=_proposals_query_params(query)) or []
 
 
-def fetch_proposal_by_id(proposal_id: int) -> Optional[Dict[str, Any]]:
+async def fetch_proposals_async(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    `fetch_proposals` for async handlers; awaits Supabase instead of blocking a worker thread.
+    Results are cached for PROPOSAL_LIST_CACHE_TTL seconds per distinct query.
+    """
+    params = _proposals_query_params(query)
+    key = ("list", *sorted((k, str(v)) for k, v in params.items()))
+    cached = _read_cache_get(key)
+    if cached is not None:
+        return cached
+    generation = _read_cache_generation
+    rows = await _request_async("GET", "proposals", params=params) or []
+    _read_cache_put(key, rows, PROPOSAL_LIST_CACHE_TTL_SECONDS, generation)
+    return rows
+
+
+def fetch_proposal_by_id(proposal_id: int, *, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Proposal with its embeds, cached for PROPOSAL_CACHE_TTL seconds. Pass `use_cache=False` when
+    the row drives a write decision: the cache only sees writes made by this process.
+    """
+    key = ("proposal", proposal_id)
+    if use_cache:
+        cached = _read_cache_get(key)
+        if cached is not None:
+            return cached
+    # Callers (detail endpoint, PDF upload / policy analysis) only use the PDF links from raw_json,
+    # so project those like list reads do; the full extracted text is still returned.
     params = {
-        "select": "*,proposal_labels(*),proposal_policy_analyses(*),proposal_pdf_texts(*)",
+        "select": f"{_LIST_PROPOSAL_COLUMNS},proposal_labels(*),proposal_policy_analyses(*),proposal_pdf_texts(*)",
         "id": f"eq.{proposal_id}",
         "limit": 1,
     }
+    generation = _read_cache_generation
     data = _request("GET", "proposals", params=params) or []
-    return data[0] if data else None
+    row = data[0] if data else None
+    if row is not None:
+        _read_cache_put(key, row, PROPOSAL_CACHE_TTL_SECONDS, generation)
+    return row
 
 
 def fetch_proposals_page(
     *,
     select: str,
     limit: int,
-    offset: int,
+    offset: int = 0,
+    after_id: Optional[int] = None,
     order: str = "id.asc",
     filters: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
     """
     Lightweight paging helper for internal maintenance tasks (e.g. backfills).
+
+    Prefer `after_id` (keyset on the primary key, with the default `order="id.asc"`) over
+    `offset` for full scans: each page is an index range scan instead of skipping `offset` rows.
     """
     params: Dict[str, Any] = {
         "select": select,
         "limit": limit,
-        "offset": offset,
         "order": order,
     }
+    if offset:
+        params["offset"] = offset
+    if after_id is not None:
+        params["id"] = f"gt.{after_id}"
     if filters:
         params.update(filters)
     return _request("GET", "proposals", params=params) or []
@@ -135,20 +363,46 @@ def insert_ingestion_run(payload: Dict[str, Any]) -> Dict[str, Any]:
     return data[0]
 
 
+# Write helpers that return None ask PostgREST for no response body (its default today, but
+# explicit so a server/config change can't start sending rows nobody reads).
+_RETURN_MINIMAL = {"Prefer": "return=minimal"}
+
+
 def update_ingestion_run(run_id: str, payload: Dict[str, Any]) -> None:
     params = {"id": f"eq.{run_id}"}
-    _request("PATCH", "ingestion_runs", params=params, json=payload)
+    _request("PATCH", "ingestion_runs", params=params, json=payload, headers=_RETURN_MINIMAL)
 
 
 def upsert_proposal(payload: Dict[str, Any]) -> None:
-    headers = {"Prefer": "resolution=merge-duplicates"}
-    params = {"on_conflict": "id"}
-    _request("POST", "proposals", params=params, json=payload, headers=headers)
+    upsert_proposals_bulk([payload])
 
 
 def update_proposal(proposal_id: int, payload: Dict[str, Any]) -> None:
     params = {"id": f"eq.{proposal_id}"}
-    _request("PATCH", "proposals", params=params, json=payload)
+    _request("PATCH", "proposals", params=params, json=payload, headers=_RETURN_MINIMAL)
+
+
+def upsert_proposals_bulk(rows: List[Dict[str, Any]]) -> None:
+    """
+    Upsert many proposals in one request (PostgREST bulk upsert on `id`).
+
+    Each row must carry every NOT NULL column of `proposals`, and all rows must have the same keys.
+    """
+    if not rows:
+        return
+    headers = {"Prefer": "resolution=merge-duplicates,return=minimal"}
+    params = {"on_conflict": "id"}
+    _request("POST", "proposals", params=params, json=rows, headers=headers)
+
+
+def update_proposals_bulk(rows: List[Dict[str, Any]]) -> None:
+    """
+    Write many existing proposals in one request.
+
+    Unlike `update_proposal` (PATCH), this goes through INSERT ... ON CONFLICT, so the rows must be
+    full proposals; see `upsert_proposals_bulk`.
+    """
+    upsert_proposals_bulk(rows)
 
 
 def upsert_proposal_label(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -166,7 +420,38 @@ def upsert_proposal_policy_analysis(payload: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def upsert_proposal_pdf_text(payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Pass extracted_at when updating an existing row: the column default only applies to inserts.
+    # `upsert_proposal_pdf_text_and_policy` stamps it either way.
     headers = {"Prefer": "resolution=merge-duplicates,return=representation"}
     params = {"on_conflict": "proposal_id"}
     data = _request("POST", "proposal_pdf_texts", params=params, json=payload, headers=headers) or []
     return data[0] if data else payload
+
+
+def upsert_proposal_pdf_text_and_policy(
+    pdf_text: Dict[str, Any], policy: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Upsert a proposal's PDF text and, if given, its policy analysis in one request/transaction
+    (RPC `upsert_pdf_text_and_policy`, migration 007).
+
+    Returns {"pdfText": row, "policy": row or None}.
+    """
+    data = _request("POST", "rpc/upsert_pdf_text_and_policy", json={"p_pdf": pdf_text, "p_policy": policy})
+    return data or {"pdfText": pdf_text, "policy": policy}
+
+
+def fetch_policy_analysis_cache(key: str, max_age_seconds: float) -> Optional[Dict[str, Any]]:
+    """Cached policy-analysis JSON for `key` if stored within the last `max_age_seconds`, else None."""
+    cutoff = datetime.fromtimestamp(time.time() - max_age_seconds, timezone.utc).isoformat()
+    params = {"select": "analysis", "key": f"eq.{key}", "created_at": f"gt.{cutoff}", "limit": 1}
+    data = _request("GET", "policy_analysis_cache", params=params) or []
+    return data[0].get("analysis") if data else None
+
+
+def upsert_policy_analysis_cache(payload: Dict[str, Any]) -> None:
+    # created_at is sent explicitly so replacing an expired entry restarts its TTL.
+    headers = {"Prefer": "resolution=merge-duplicates,return=minimal"}
+    params = {"on_conflict": "key"}
+    payload = {**payload, "created_at": datetime.now(timezone.utc).isoformat()}
+    _request("POST", "policy_analysis_cache", params=params, json=payload, headers=headers)
@@ -0,0 +1,119 @@
+-- Filter columns on proposals so /proposals can filter in the database instead of scanning
+-- batches and filtering in the API:
+--   has_pdf_link         generated from raw_json (mainPdfUrl / pdfUrls)
+--   has_pdf_text         kept in sync by triggers on proposal_pdf_texts
+--   has_policy_analysis  kept in sync by triggers on proposal_policy_analyses
+--   merged_tags          lowercased IT topics (proposal_labels) + policy tags (proposal_policy_analyses)
+
+ALTER TABLE proposals
+    ADD COLUMN IF NOT EXISTS has_pdf_link BOOLEAN GENERATED ALWAYS AS (
+        COALESCE(
+            (jsonb_typeof(raw_json -> 'mainPdfUrl') = 'string' AND raw_json ->> 'mainPdfUrl' <> '')
+            OR CASE
+                WHEN jsonb_typeof(raw_json -> 'pdfUrls') = 'array' THEN jsonb_array_length(raw_json -> 'pdfUrls') > 0
+                ELSE FALSE
+            END,
+            FALSE
+        )
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS has_pdf_text BOOLEAN NOT NULL DEFAULT FALSE,
+    ADD COLUMN IF NOT EXISTS has_policy_analysis BOOLEAN NOT NULL DEFAULT FALSE,
+    ADD COLUMN IF NOT EXISTS merged_tags TEXT[] NOT NULL DEFAULT '{}';
+
+-- Tags from a policy analysis: `tags` (strings or {"tag": ...}), falling back to
+-- `democratic_it_concerns` (strings or {"topic": ...}) when there are no tags.
+CREATE OR REPLACE FUNCTION policy_analysis_tags(analysis JSONB)
+RETURNS TEXT[] AS $$
+    WITH tags AS (
+        SELECT CASE jsonb_typeof(item)
+            WHEN 'string' THEN item #>> '{}'
+            WHEN 'object' THEN CASE WHEN jsonb_typeof(item -> 'tag') = 'string' THEN item ->> 'tag' END
+        END AS tag
+        FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(analysis -> 'tags') = 'array' THEN analysis -> 'tags' ELSE '[]'::jsonb END
+        ) AS item
+    ),
+    concerns AS (
+        SELECT CASE jsonb_typeof(item)
+            WHEN 'string' THEN item #>> '{}'
+            WHEN 'object' THEN CASE WHEN jsonb_typeof(item -> 'topic') = 'string' THEN item ->> 'topic' END
+        END AS tag
+        FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(analysis -> 'democratic_it_concerns') = 'array'
+                THEN analysis -> 'democratic_it_concerns' ELSE '[]'::jsonb END
+        ) AS item
+    ),
+    picked AS (
+        SELECT tag FROM tags WHERE tag IS NOT NULL
+        UNION ALL
+        SELECT tag FROM concerns
+        WHERE tag IS NOT NULL AND NOT EXISTS (SELECT 1 FROM tags WHERE tag IS NOT NULL)
+    )
+    SELECT COALESCE(array_agg(lower(btrim(tag, E' \t\r\n'))), '{}')
+    FROM picked
+    WHERE btrim(tag, E' \t\r\n') <> '' AND lower(btrim(tag, E' \t\r\n')) <> 'not_applicable';
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION refresh_proposal_filter_columns(p_proposal_id INTEGER)
+RETURNS VOID AS $$
+    UPDATE proposals p SET
+        has_pdf_text = EXISTS (
+            SELECT 1 FROM proposal_pdf_texts t
+            WHERE t.proposal_id = p.id AND t.extracted_text <> '' AND COALESCE(t.error, '') = ''
+        ),
+        has_policy_analysis = EXISTS (
+            SELECT 1 FROM proposal_policy_analyses a
+            WHERE a.proposal_id = p.id AND a.analysis <> '{}'::jsonb
+        ),
+        merged_tags = ARRAY(
+            SELECT DISTINCT tag FROM (
+                SELECT lower(btrim(topic, E' \t\r\n')) AS tag
+                FROM proposal_labels l, unnest(l.it_topics) AS topic
+                WHERE l.proposal_id = p.id
+                UNION ALL
+                SELECT unnest(policy_analysis_tags(a.analysis))
+                FROM proposal_policy_analyses a
+                WHERE a.proposal_id = p.id
+            ) s
+            WHERE tag <> ''
+        )
+    WHERE p.id = p_proposal_id;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION refresh_proposal_filter_columns_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM refresh_proposal_filter_columns(NEW.proposal_id);
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.proposal_id <> NEW.proposal_id) THEN
+        PERFORM refresh_proposal_filter_columns(OLD.proposal_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS refresh_filters_from_pdf_texts ON proposal_pdf_texts;
+CREATE TRIGGER refresh_filters_from_pdf_texts
+    AFTER INSERT OR UPDATE OR DELETE ON proposal_pdf_texts
+    FOR EACH ROW EXECUTE FUNCTION refresh_proposal_filter_columns_trigger();
+
+DROP TRIGGER IF EXISTS refresh_filters_from_policy_analyses ON proposal_policy_analyses;
+CREATE TRIGGER refresh_filters_from_policy_analyses
+    AFTER INSERT OR UPDATE OR DELETE ON proposal_policy_analyses
+    FOR EACH ROW EXECUTE FUNCTION refresh_proposal_filter_columns_trigger();
+
+DROP TRIGGER IF EXISTS refresh_filters_from_labels ON proposal_labels;
+CREATE TRIGGER refresh_filters_from_labels
+    AFTER INSERT OR UPDATE OR DELETE ON proposal_labels
+    FOR EACH ROW EXECUTE FUNCTION refresh_proposal_filter_columns_trigger();
+
+-- Only bump updated_at for changes to the proposal itself, not for the trigger-maintained columns.
+DROP TRIGGER IF EXISTS update_proposals_updated_at ON proposals;
+CREATE TRIGGER update_proposals_updated_at
+    BEFORE UPDATE OF periodeid, nummerprefix, nummernumerisk, nummer, titel, resume, opdateringsdato, raw_json
+    ON proposals
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Backfill existing rows.
+SELECT refresh_proposal_filter_columns(id) FROM proposals;
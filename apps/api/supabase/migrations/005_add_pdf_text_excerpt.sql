@@ -0,0 +1,8 @@
+-- PostgREST computed field: a short prefix of the extracted PDF text.
+-- List endpoints select this (aliased as extracted_text) instead of the full text, which can be
+-- ~200 KB per proposal; the single-proposal endpoint still returns the whole text.
+
+CREATE OR REPLACE FUNCTION extracted_text_excerpt(proposal_pdf_texts)
+RETURNS TEXT AS $$
+    SELECT left($1.extracted_text, 200);
+$$ LANGUAGE sql STABLE;
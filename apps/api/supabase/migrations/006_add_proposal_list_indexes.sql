@@ -0,0 +1,24 @@
+-- Indexes for the /proposals list filters (004) and keyset paging.
+-- proposal_labels / proposal_policy_analyses / proposal_pdf_texts are keyed by proposal_id
+-- (their primary key), so the embeds and the filter-column triggers already use an index.
+
+-- Keyset paging / default ordering: ORDER BY opdateringsdato DESC, id DESC.
+CREATE INDEX IF NOT EXISTS idx_proposals_opdateringsdato_id
+    ON proposals (opdateringsdato DESC, id DESC);
+
+-- Topic filter: merged_tags @> '{topic}'.
+CREATE INDEX IF NOT EXISTS idx_proposals_merged_tags
+    ON proposals USING GIN (merged_tags);
+
+-- "Has X" filters select a minority of rows; partial indexes in list order let Postgres read
+-- the matching page directly instead of scanning and discarding.
+CREATE INDEX IF NOT EXISTS idx_proposals_has_pdf_link
+    ON proposals (opdateringsdato DESC, id DESC) WHERE has_pdf_link;
+CREATE INDEX IF NOT EXISTS idx_proposals_has_pdf_text
+    ON proposals (opdateringsdato DESC, id DESC) WHERE has_pdf_text;
+CREATE INDEX IF NOT EXISTS idx_proposals_has_policy_analysis
+    ON proposals (opdateringsdato DESC, id DESC) WHERE has_policy_analysis;
+
+-- it_relevant filter (inner join on proposal_labels).
+CREATE INDEX IF NOT EXISTS idx_proposal_labels_it_relevant
+    ON proposal_labels (it_relevant);
@@ -0,0 +1,47 @@
+-- Let the database stamp proposal_pdf_texts.extracted_at instead of the API sending its own clock.
+-- Callers may still pass extracted_at explicitly; it is only defaulted when omitted.
+
+ALTER TABLE proposal_pdf_texts ALTER COLUMN extracted_at SET DEFAULT NOW();
+
+-- Same as 007, except a missing extracted_at means "now" on both insert and conflict-update
+-- (a plain column default only applies to the insert).
+CREATE OR REPLACE FUNCTION upsert_pdf_text_and_policy(p_pdf JSONB, p_policy JSONB DEFAULT NULL)
+RETURNS JSONB AS $$
+DECLARE
+    v_proposal_id INTEGER := (p_pdf ->> 'proposal_id')::INTEGER;
+    v_pdf proposal_pdf_texts;
+    v_policy proposal_policy_analyses;
+BEGIN
+    INSERT INTO proposal_pdf_texts (proposal_id, source_url, sha256, extracted_text, extracted_at, error)
+    VALUES (
+        v_proposal_id,
+        p_pdf ->> 'source_url',
+        p_pdf ->> 'sha256',
+        COALESCE(p_pdf ->> 'extracted_text', ''),
+        COALESCE((p_pdf ->> 'extracted_at')::TIMESTAMPTZ, NOW()),
+        p_pdf ->> 'error'
+    )
+    ON CONFLICT (proposal_id) DO UPDATE SET
+        source_url = EXCLUDED.source_url,
+        sha256 = EXCLUDED.sha256,
+        extracted_text = EXCLUDED.extracted_text,
+        extracted_at = EXCLUDED.extracted_at,
+        error = EXCLUDED.error
+    RETURNING * INTO v_pdf;
+
+    IF jsonb_typeof(p_policy) = 'object' THEN
+        INSERT INTO proposal_policy_analyses (proposal_id, analysis, model, prompt_version)
+        VALUES (v_proposal_id, p_policy -> 'analysis', p_policy ->> 'model', p_policy ->> 'prompt_version')
+        ON CONFLICT (proposal_id) DO UPDATE SET
+            analysis = EXCLUDED.analysis,
+            model = EXCLUDED.model,
+            prompt_version = EXCLUDED.prompt_version
+        RETURNING * INTO v_policy;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'pdfText', to_jsonb(v_pdf),
+        'policy', CASE WHEN v_policy.proposal_id IS NULL THEN NULL ELSE to_jsonb(v_policy) END
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,35 @@
+-- policy_analysis_tags (004) runs for every policy-analysis write via the filter-column trigger.
+-- Normalize each tag (btrim + lower) once instead of three times, and stop scanning
+-- democratic_it_concerns when the analysis has usable tags.
+
+CREATE OR REPLACE FUNCTION policy_analysis_tags(analysis JSONB)
+RETURNS TEXT[] AS $$
+    WITH tags AS (
+        SELECT CASE jsonb_typeof(item)
+            WHEN 'string' THEN item #>> '{}'
+            WHEN 'object' THEN CASE WHEN jsonb_typeof(item -> 'tag') = 'string' THEN item ->> 'tag' END
+        END AS tag
+        FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(analysis -> 'tags') = 'array' THEN analysis -> 'tags' ELSE '[]'::jsonb END
+        ) AS item
+    ),
+    concerns AS (
+        SELECT CASE jsonb_typeof(item)
+            WHEN 'string' THEN item #>> '{}'
+            WHEN 'object' THEN CASE WHEN jsonb_typeof(item -> 'topic') = 'string' THEN item ->> 'topic' END
+        END AS tag
+        FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(analysis -> 'democratic_it_concerns') = 'array'
+                 AND NOT EXISTS (SELECT 1 FROM tags WHERE tag IS NOT NULL)
+                THEN analysis -> 'democratic_it_concerns' ELSE '[]'::jsonb END
+        ) AS item
+    ),
+    normalized AS (
+        SELECT lower(btrim(tag, E' \t\r\n')) AS tag
+        FROM (SELECT tag FROM tags UNION ALL SELECT tag FROM concerns) picked
+        WHERE tag IS NOT NULL
+    )
+    SELECT COALESCE(array_agg(tag), '{}')
+    FROM normalized
+    WHERE tag <> '' AND tag <> 'not_applicable';
+$$ LANGUAGE sql IMMUTABLE;
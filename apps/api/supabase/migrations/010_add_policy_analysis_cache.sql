@@ -0,0 +1,14 @@
+-- Content-addressed cache of policy-analysis LLM responses.
+-- key = sha256(prompt version | model | temperature | max tokens | schema name | prompt messages), so
+-- re-running enrichment on unchanged input (or retrying failed rows) doesn't pay for the LLM again.
+
+CREATE TABLE IF NOT EXISTS policy_analysis_cache (
+    key TEXT PRIMARY KEY,
+    analysis JSONB NOT NULL,
+    model TEXT,
+    prompt_version TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Lookups filter on created_at for the TTL; also lets old entries be pruned cheaply.
+CREATE INDEX IF NOT EXISTS idx_policy_analysis_cache_created_at ON policy_analysis_cache (created_at);
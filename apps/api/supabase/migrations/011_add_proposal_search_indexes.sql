@@ -0,0 +1,12 @@
+-- Free-text search on /proposals?q=... filters titel/nummer/resume with ILIKE '%term%'.
+-- Trigram GIN indexes let Postgres answer those (and the OR across them, via a BitmapOr)
+-- without scanning every row.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_proposals_titel_trgm
+    ON proposals USING GIN (titel gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_proposals_resume_trgm
+    ON proposals USING GIN (resume gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_proposals_nummer_trgm
+    ON proposals USING GIN (nummer gin_trgm_ops);